@@ -1,29 +1,51 @@
-from flask import Blueprint, Flask, request, jsonify, session
+import time
+_import_started = time.perf_counter()
+
+from flask import Blueprint, Flask, request, jsonify, session, g, Response, stream_with_context
 from flask_cors import CORS
-import cv2
-import numpy as np
 import base64
 import pyodbc
 import os
 import json
-import bcrypt
-from insightface.app import FaceAnalysis
 from dotenv import load_dotenv
 
-import random 
-import time
+import io
+from contextlib import contextmanager
+from datetime import datetime
 from flask_mail import Mail, Message
 
-import tempfile
-from app_modules.summarisation.abs_summarisation import summarize_file as abs_summarize
-from app_modules.summarisation.ext_summarisation import summarize_file as ext_summarize
+from app_modules.summarisation.abs_summarisation import summarize_file as abs_summarize, stream_summary, summary_node_stats
+from app_modules.answer_cache import answer_cache_stats
+from app_modules.summarisation.ext_summarisation import (
+    summarize_file as ext_summarize, EMBEDDING_MODEL_NAME as EXT_MODEL_NAME, SUMMARY_SCOPE as EXT_SUMMARY_SCOPE,
+)
 from app_modules.image_captioning import generate_caption
-from app_modules.rag import handle_rag_pipeline
-from app_modules.qaGenerator import handle_qa_pipeline
+from app_modules.rag import (
+    handle_rag_pipeline, ingest_document, answer_question, get_collection, collection_loaded, ingest_stats,
+    set_document_lock,
+    EMBEDDING_MODEL_NAME as RAG_MODEL_NAME,
+)
+from app_modules.qaGenerator import handle_qa_pipeline, plan_qa, stream_qa
 from app_modules.doubt_solving import extract_text_from_image, solve_with_gemini
-from app_modules.notes import generate_note_from_file
-
-from werkzeug.utils import secure_filename
+from app_modules.notes import generate_note_from_file, stream_notes
+from app_modules.model_registry import warm_up, model_stats
+from app_modules.llm_cache import set_bypass, reset_bypass, llm_cache_stats
+from app_modules.document_cache import document_cache_stats
+from app_modules.ocr import ocr_stats, get_ocr_service
+from app_modules import gemini
+import startup
+from face_index import FaceIndex, FACE_MATCH_THRESHOLD
+from db_pool import ConnectionPool
+from log_sink import LogSink
+from compute_pool import (
+    PoolSaturated, start_face_workers, face_embedding, hash_password, check_password, compute_stats,
+)
+from mail_queue import MailQueue
+from jobs import create_job_manager, FINISHED_STATES, SUCCEEDED
+from otp_store import create_otp_store, OTP_OK, OTP_MISSING, OTP_EXPIRED, OTP_LOCKED
+from app_modules.extraction import read_upload
+from app_modules.pdf_extraction import start_pdf_workers, extraction_stats
+from werkzeug.datastructures import FileStorage
 
 # Load environment variables from .env file
 load_dotenv()
@@ -34,99 +56,262 @@ app.secret_key = os.getenv("SECRET_KEY")
 # Enable CORS
 CORS(app, supports_credentials=True, origins=["*"])
 
-# Load InsightFace model
-face_app = FaceAnalysis(name="buffalo_l", providers=["CPUExecutionProvider"])
-face_app.prepare(ctx_id=0)
-
-# SQL Server Connection
-conn = pyodbc.connect(
-    f"DRIVER={os.getenv('SQL_DRIVER')};"
-    f"SERVER={os.getenv('SQL_SERVER')};"
-    f"DATABASE={os.getenv('SQL_DATABASE')};"
-    f"UID={os.getenv('SQL_USER')};"
-    f"PWD={os.getenv('SQL_PASSWORD')}"
+@app.errorhandler(PoolSaturated)
+def compute_pool_saturated(e):
+    response = jsonify({"error": "Server is busy, please retry shortly"})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
+# SQL Server Connection Pool
+def connect_sql_server():
+    return pyodbc.connect(
+        f"DRIVER={os.getenv('SQL_DRIVER')};"
+        f"SERVER={os.getenv('SQL_SERVER')};"
+        f"DATABASE={os.getenv('SQL_DATABASE')};"
+        f"UID={os.getenv('SQL_USER')};"
+        f"PWD={os.getenv('SQL_PASSWORD')}"
+    )
+
+db_pool = ConnectionPool(
+    connect_sql_server,
+    max_size=int(os.getenv("SQL_POOL_SIZE", "10")),
+    acquire_timeout=float(os.getenv("SQL_POOL_TIMEOUT", "10")),
 )
-cursor = conn.cursor()
-
-# Create userAuthentication table if not exists
-cursor.execute("""
-IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='userAuthentication' and xtype='U')
-BEGIN
-    CREATE TABLE userAuthentication (
-        id INT IDENTITY(1,1) PRIMARY KEY,
-        first_name NVARCHAR(255) NOT NULL,
-        last_name NVARCHAR(255) NOT NULL,
-        email NVARCHAR(255) UNIQUE NOT NULL,
-        password_hash VARBINARY(MAX) NOT NULL,
-        image_embedding VARBINARY(MAX) NOT NULL,
-        role NVARCHAR(50) DEFAULT 'user'
-) END
-""")
-
-# Create UserLogs table if not exists
-cursor.execute("""
-IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='UserLogs' and xtype='U')
-BEGIN
-    CREATE TABLE UserLogs (
-        id INT IDENTITY(1,1) PRIMARY KEY,
-        user_id INT FOREIGN KEY REFERENCES userAuthentication(id),
-        action NVARCHAR(100) NOT NULL,
-        timestamp DATETIME DEFAULT GETDATE(),
-        ip_address NVARCHAR(100) NULL,
-        method NVARCHAR(50) NULL
-) END
-""")
-conn.commit()
-
-# Create Feedback table if it does not exist
-cursor.execute("""
-    IF NOT EXISTS (
-        SELECT * FROM sysobjects WHERE name = 'Feedback' and xtype='U')
-
-    BEGIN
-        CREATE TABLE Feedback (
-            id INT IDENTITY(1,1) PRIMARY KEY,
-            name NVARCHAR(100),
-            email NVARCHAR(100),
-            message NVARCHAR(MAX),
-            created_at DATETIME DEFAULT GETDATE()
-        )
-    END
-""")
-conn.commit()
+
+# Only one process at a time may ingest a given RAG document. The application
+# lock is owned by its own session, not a pooled one: an ingest can take
+# minutes, and if this process dies the server drops the session and the lock.
+RAG_INGEST_LOCK_TIMEOUT = int(os.getenv("RAG_INGEST_LOCK_TIMEOUT", "600"))
+
+@contextmanager
+def rag_document_lock(doc_id):
+    conn = connect_sql_server()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SET NOCOUNT ON;
+            DECLARE @result INT;
+            EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive',
+                                         @LockOwner = 'Session', @LockTimeout = ?;
+            SELECT @result;
+        """, (f"rag-ingest:{doc_id}", RAG_INGEST_LOCK_TIMEOUT * 1000))
+        if cursor.fetchone()[0] < 0:
+            raise TimeoutError(f"Document {doc_id} is still being ingested by another worker")
+        yield
+    finally:
+        # Closing the session releases the lock
+        conn.close()
+
+set_document_lock(rag_document_lock)
+
+# Per-request LLM cache bypass: ?no_cache=1 or an "X-No-Cache: 1" header
+@app.before_request
+def apply_cache_bypass():
+    bypass = request.args.get("no_cache") == "1" or request.headers.get("X-No-Cache") == "1"
+    g.llm_cache_token = set_bypass(bypass)
+
+@app.teardown_request
+def clear_cache_bypass(exc):
+    token = g.pop("llm_cache_token", None)
+    if token is not None:
+        reset_bypass(token)
+
+# Check out one pooled connection per request; it is released on teardown
+def get_db():
+    startup.ensure("database")
+    if "db" not in g:
+        g.db = db_pool.acquire()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exc):
+    db = g.pop("db", None)
+    if db is not None:
+        db_pool.release(db, error=exc)
+
+# Create tables if they do not exist
+def init_db():
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+
+        # Create userAuthentication table if not exists
+        cursor.execute("""
+        IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='userAuthentication' and xtype='U')
+        BEGIN
+            CREATE TABLE userAuthentication (
+                id INT IDENTITY(1,1) PRIMARY KEY,
+                first_name NVARCHAR(255) NOT NULL,
+                last_name NVARCHAR(255) NOT NULL,
+                email NVARCHAR(255) UNIQUE NOT NULL,
+                password_hash VARBINARY(MAX) NOT NULL,
+                image_embedding VARBINARY(MAX) NOT NULL,
+                role NVARCHAR(50) DEFAULT 'user'
+        ) END
+        """)
+
+        # Create UserLogs table if not exists
+        cursor.execute("""
+        IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='UserLogs' and xtype='U')
+        BEGIN
+            CREATE TABLE UserLogs (
+                id INT IDENTITY(1,1) PRIMARY KEY,
+                user_id INT FOREIGN KEY REFERENCES userAuthentication(id),
+                action NVARCHAR(100) NOT NULL,
+                timestamp DATETIME DEFAULT GETDATE(),
+                ip_address NVARCHAR(100) NULL,
+                method NVARCHAR(50) NULL
+        ) END
+        """)
+        conn.commit()
+
+        # Who may ask questions about an ingested document (doc_id = content hash).
+        # Ingest is deduplicated across users, so every uploader gets a row.
+        cursor.execute("""
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='RagDocumentAccess' and xtype='U')
+            BEGIN
+                CREATE TABLE RagDocumentAccess (
+                    doc_id CHAR(64) NOT NULL,
+                    user_email NVARCHAR(255) NOT NULL,
+                    granted_at DATETIME DEFAULT GETDATE(),
+                    PRIMARY KEY (doc_id, user_email)
+                )
+            END
+        """)
+        conn.commit()
+
+        # Create Feedback table if it does not exist
+        cursor.execute("""
+            IF NOT EXISTS (
+                SELECT * FROM sysobjects WHERE name = 'Feedback' and xtype='U')
+
+            BEGIN
+                CREATE TABLE Feedback (
+                    id INT IDENTITY(1,1) PRIMARY KEY,
+                    name NVARCHAR(100),
+                    email NVARCHAR(100),
+                    message NVARCHAR(MAX),
+                    created_at DATETIME DEFAULT GETDATE()
+                )
+            END
+        """)
+        conn.commit()
+
+# Load every stored face embedding once so logins never scan the table
+face_index = FaceIndex()
+
+def load_face_index():
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, image_embedding FROM userAuthentication")
+        face_index.build(cursor.fetchall())
+
+# Each worker has its own index. Users registered through another worker are
+# picked up on a miss (rows newer than the highest known id), at most once per
+# FACE_INDEX_REFRESH_SECONDS; users deleted elsewhere are dropped on a stale match.
+FACE_INDEX_REFRESH_SECONDS = float(os.getenv("FACE_INDEX_REFRESH_SECONDS", "2"))
+
+def refresh_face_index():
+    cursor = get_db().cursor()
+    cursor.execute("SELECT id, image_embedding FROM userAuthentication WHERE id > ?", (face_index.max_id(),))
+    added = face_index.merge(cursor.fetchall())
+    if added:
+        print(f"Face index picked up {added} new embeddings.")
+
+# -------------------------------
+# Startup resources
+# -------------------------------
+# Nothing heavy happens at import: each resource is created by the first request
+# that needs it or by the background warm-up below, with its load time logged.
+# Only the required ones gate /readyz.
+def load_database():
+    init_db()
+
+def load_face_index_resource():
+    startup.ensure("database")
+    load_face_index()
+
+def load_sentence_models():
+    warm_up([RAG_MODEL_NAME, EXT_MODEL_NAME])
+
+def load_pdf_workers():
+    workers = start_pdf_workers()  # None when PDF_WORKERS <= 1
+    if workers is not None:
+        workers.result()
+
+startup.register("database", load_database, required=True)
+startup.register("face_index", load_face_index_resource, required=True)
+# The InsightFace and PDF process pools are forked on first use or by the warm-up, never at import
+startup.register("face_workers", lambda: start_face_workers().result(), required=True, per_process=True)
+startup.register("pdf_workers", load_pdf_workers, per_process=True)
+startup.register("sentence_models", load_sentence_models,
+                 is_loaded=lambda: {RAG_MODEL_NAME, EXT_MODEL_NAME} <= set(model_stats()))
+startup.register("ocr", lambda: get_ocr_service().get_reader(),
+                 is_loaded=lambda: ocr_stats()["load_seconds"] is not None)
+startup.register("milvus", get_collection, is_loaded=collection_loaded)
+startup.register("gemini", gemini.warm_up, is_loaded=gemini.is_configured)
+
+WARMUP = [name.strip() for name in os.getenv("WARMUP", "database,face_index,face_workers").split(",") if name.strip()]
+# Backwards compatible switch from before WARMUP existed
+if os.getenv("WARMUP_MODELS", "0") == "1" and "sentence_models" not in WARMUP:
+    WARMUP.append("sentence_models")
+# app.run(debug=True) below imports this module in the reloader's watcher process
+# too; only the child that serves requests warms up. Under gunicorn --preload,
+# run startup.warm_up(WARMUP) from a post_fork hook as well: per-process
+# resources (the worker pools) are reset in every forked worker.
+if __name__ != "__main__" or os.getenv("WERKZEUG_RUN_MAIN") == "true":
+    startup.warm_up(WARMUP)
 
 # Log user action
+# Rows are batched by a background writer so logins never wait on a commit
+audit_log = LogSink(
+    db_pool.connection,
+    """
+        INSERT INTO UserLogs (user_id, action, timestamp, ip_address, method)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    max_queue=int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("AUDIT_LOG_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("AUDIT_LOG_FLUSH_SECONDS", "1.0")),
+    name="audit-log",
+).start()
+
 def log_user_action(user_id, action, ip=None, method=None):
-    cursor.execute("""
-        INSERT INTO UserLogs (user_id, action, ip_address, method)
-        VALUES (?, ?, ?, ?)
-    """, (user_id, action, ip, method))
-    conn.commit()
+    audit_log.submit((user_id, action, datetime.now(), ip, method))
 
 # Encode face image to embedding
 def encode_face(image_bytes):
     try:
-        np_data = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
-        if image is None:
-            return None
-        faces = face_app.get(image)
-        if not faces:
-            return None
-        return np.array(faces[0].normed_embedding, dtype=np.float32)
-    except:
+        return face_embedding(image_bytes)
+    except PoolSaturated:
+        raise
+    except Exception:
         return None
     
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+# For local testing point these at a debugging SMTP server, e.g.
+#   python -m aiosmtpd -n -l localhost:1025   with MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=0
+app.config['MAIL_SERVER'] = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+app.config['MAIL_PORT'] = int(os.getenv("MAIL_PORT", "587"))
+app.config['MAIL_USE_TLS'] = os.getenv("MAIL_USE_TLS", "1") == "1"
 app.config['MAIL_USERNAME'] = os.getenv("MAIL_USERNAME")  
 app.config['MAIL_PASSWORD'] = os.getenv("MAIL_PASSWORD")  
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv("MAIL_SENDER")
 
 mail = Mail(app)
 
-otp_storage = {}  
+# Outbound mail is sent by background workers over reused SMTP connections,
+# so request threads never wait on the TLS handshake or SMTP conversation.
+mail_queue = MailQueue(
+    mail.connect,
+    workers=int(os.getenv("MAIL_WORKERS", "2")),
+    max_queue=int(os.getenv("MAIL_QUEUE_SIZE", "1000")),
+    retries=int(os.getenv("MAIL_RETRIES", "3")),
+    backoff=float(os.getenv("MAIL_RETRY_BACKOFF", "2.0")),
+    idle_timeout=float(os.getenv("MAIL_IDLE_TIMEOUT", "30")),
+    context=app.app_context,
+).start()
+
+# OTP_STORE=sqlite (with OTP_DB) shares codes between worker processes on one host
+otp_store = create_otp_store()
 
 # 1. Send OTP
 @app.route('/send_otp', methods=['POST'])
@@ -137,9 +322,9 @@ def send_otp():
     
     if not email:
         return jsonify({"success": False, "message": "Email required"}), 400
-    
-    if email in otp_storage:
-        del otp_storage[email]
+
+    conn = get_db()
+    cursor = conn.cursor()
 
     # Check if user already exists
     cursor.execute("SELECT id FROM userAuthentication WHERE email = ?", (email,))
@@ -147,8 +332,8 @@ def send_otp():
         return jsonify({"success": False, "message": "Email already registered"}), 400
 
     # Generate OTP
-    otp = str(random.randint(100000, 999999))
-    otp_storage[email] = {"otp": otp, "expires": time.time() + 300}  # valid 5 min
+    otp = otp_store.issue(email)
+    valid_minutes = max(1, int(otp_store.ttl // 60))
 
     try:
         msg = Message("Your One-Time Password (OTP) for SmartDesk Login", sender=app.config["MAIL_USERNAME"], recipients=[email])
@@ -156,16 +341,21 @@ def send_otp():
 
                         Your One-Time Password (OTP) is: {otp}
 
-                        This code is valid for the next 5 minutes. 
+                        This code is valid for the next {valid_minutes} minutes. 
                         Please do not share this code with anyone for your account’s security.
 
                         If you didn’t request this OTP, please ignore this email or contact support.
 
                         Thank you,
                         Team SmartDesk"""
-        mail.send(msg)
-        return jsonify({"success": True, "message": "Verification code sent"})
+        # A code that could not be delivered must not stay valid
+        message_id = mail_queue.submit(msg, on_failure=lambda e: otp_store.discard(email, otp))
+        if message_id is None:
+            otp_store.discard(email)
+            return jsonify({"success": False, "message": "Mail service busy, please try again shortly"}), 503
+        return jsonify({"success": True, "message": "Verification code sent", "message_id": message_id})
     except Exception as e:
+        otp_store.discard(email)
         return jsonify({"success": False, "message": f"Failed to send email: {str(e)}"}), 500
 
 # 2. Verify OTP + Register User
@@ -184,55 +374,58 @@ def verify_otp():
         if not all([first_name, last_name, email, password, image_data, otp]):
             return jsonify({"error": "All fields including OTP are required"}), 400
 
-        # Check OTP
-        if email not in otp_storage:
-            return jsonify({"error": "No OTP request found"}), 400
+        startup.ensure("face_index")
 
-        stored_otp = otp_storage[email]
-        if time.time() > stored_otp["expires"]:
-            del otp_storage[email]
+        # Check OTP (a valid code is consumed by the check)
+        status = otp_store.verify(email, otp)
+        if status == OTP_MISSING:
+            return jsonify({"error": "No OTP request found"}), 400
+        if status == OTP_EXPIRED:
             return jsonify({"error": "OTP expired"}), 400
-
-        if otp != stored_otp["otp"]:
+        if status == OTP_LOCKED:
+            return jsonify({"error": "Too many incorrect attempts. Please request a new OTP."}), 429
+        if status != OTP_OK:
             return jsonify({"error": "Invalid OTP"}), 400
 
-        # OTP valid → delete from storage
-        del otp_storage[email]
-
         # Hash password
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+        hashed_password = hash_password(password)
 
         # Decode image & extract embedding
         try:
             image_bytes = base64.b64decode(image_data)
-            np_data = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
         except Exception:
             return jsonify({"error": "Invalid image data"}), 400
 
-        if image is None:
+        try:
+            embedding = face_embedding(image_bytes)
+        except ValueError:
             return jsonify({"error": "Image decoding failed"}), 400
-
-        faces = face_app.get(image)
-        if not faces:
+        if embedding is None:
             return jsonify({"error": "No face detected in the image"}), 400
 
-        embedding = faces[0].normed_embedding
         embedding_bytes = embedding.tobytes()
 
         # Save user to DB
+        conn = get_db()
+        cursor = conn.cursor()
         cursor.execute(
             """INSERT INTO userAuthentication 
                (first_name, last_name, email, password_hash, role, image_embedding) 
+               OUTPUT INSERTED.id
                VALUES (?, ?, ?, ?, ?, ?)""",
             (first_name, last_name, email, hashed_password, "user", embedding_bytes)
         )
+        user_id = cursor.fetchone()[0]
         conn.commit()
+        face_index.add(user_id, embedding)
 
         return jsonify({"message": "Registration successful!"}), 201
 
+    except PoolSaturated:
+        raise
     except Exception as e:
-        conn.rollback()
+        if "db" in g:
+            g.db.rollback()
         return jsonify({"error": str(e)}), 500
 
 @app.route("/password-login", methods=["POST"])
@@ -242,6 +435,8 @@ def password_login():
     password = data.get("password")
 
     # Fetch password hash and other user data
+    conn = get_db()
+    cursor = conn.cursor()
     cursor.execute(
         "SELECT id, first_name, last_name, email, password_hash, role, image_embedding FROM userAuthentication WHERE email = ?",
         (email,)
@@ -256,7 +451,7 @@ def password_login():
             db_password_hash = db_password_hash.encode('utf-8')
 
         # Verify the password
-        if bcrypt.checkpw(password.encode("utf-8"), db_password_hash):
+        if check_password(password, db_password_hash):
             session["user"] = user[3]
             session["role"] = user[5]
             log_user_action(user[0], "login", request.remote_addr, "password")
@@ -286,43 +481,53 @@ def face_login():
         image_data = image_data.split(",")[1]
 
     try:
+        startup.ensure("face_index")
         live_image_bytes = base64.b64decode(image_data)
         live_embedding = encode_face(live_image_bytes)
 
         if live_embedding is None:
             return jsonify({"error": "No face detected"}), 400
 
-        cursor.execute("""
-            SELECT id, first_name, last_name, email, image_embedding, role
-            FROM userAuthentication
-        """)
-        users = cursor.fetchall()
-
-        for user in users:
-            stored_embedding = np.frombuffer(user[4], dtype=np.float32)
-            similarity = np.dot(stored_embedding, live_embedding) / (
-                np.linalg.norm(stored_embedding) * np.linalg.norm(live_embedding)
-            )
-
-            if similarity > 0.60:
-                session["user"] = user[3]  # email
-                session["role"] = user[5]
+        match = face_index.search(live_embedding, FACE_MATCH_THRESHOLD)
+        if match is None and face_index.claim_refresh(FACE_INDEX_REFRESH_SECONDS):
+            refresh_face_index()
+            match = face_index.search(live_embedding, FACE_MATCH_THRESHOLD)
+
+        user = None
+        while match is not None:
+            cursor = get_db().cursor()
+            cursor.execute("""
+                SELECT id, first_name, last_name, email, image_embedding, role
+                FROM userAuthentication WHERE id = ?
+            """, (match[0],))
+            user = cursor.fetchone()
+            if user:
+                break
+            # Deleted through another worker: drop it and look for the next best match
+            face_index.remove(match[0])
+            match = face_index.search(live_embedding, FACE_MATCH_THRESHOLD)
+
+        if user:
+            session["user"] = user[3]  # email
+            session["role"] = user[5]
 
-                image_base64 = base64.b64encode(user[4]).decode("utf-8") if user[4] else None
+            image_base64 = base64.b64encode(user[4]).decode("utf-8") if user[4] else None
 
-                log_user_action(user[0], "login", request.remote_addr, "face")
+            log_user_action(user[0], "login", request.remote_addr, "face")
 
-                return jsonify({
-                    "message": f"Welcome {user[1]} {user[2]}!",
-                    "id": user[0],
-                    "name": f"{user[1]} {user[2]}",
-                    "email": user[3],
-                    "image": image_base64,  
-                    "role": user[5]
-                }), 200
+            return jsonify({
+                "message": f"Welcome {user[1]} {user[2]}!",
+                "id": user[0],
+                "name": f"{user[1]} {user[2]}",
+                "email": user[3],
+                "image": image_base64,  
+                "role": user[5]
+            }), 200
 
         return jsonify({"error": "Face not recognized"}), 401
 
+    except PoolSaturated:
+        raise
     except Exception as e:
         return jsonify({"error": f"Login failed: {str(e)}"}), 500
 
@@ -332,6 +537,8 @@ def admin_summary():
     if session.get("role") != "admin":
         return jsonify({"error": "Access denied: Admins only"}), 403
 
+    cursor = get_db().cursor()
+
     # Count only users with role='user'
     cursor.execute("SELECT COUNT(*) FROM userAuthentication WHERE role = 'user'")
     user_count = cursor.fetchone()[0]
@@ -363,6 +570,7 @@ def get_users():
 
     role_filter = request.args.get("role", "user")  # default to user
 
+    cursor = get_db().cursor()
     if role_filter == "all":
         cursor.execute("SELECT id, first_name, last_name, email, role FROM userAuthentication")
     else:
@@ -383,6 +591,8 @@ def delete_user(user_id):
         return jsonify({"error": "Access denied"}), 403
 
     # Ensure user exists and is not admin
+    conn = get_db()
+    cursor = conn.cursor()
     cursor.execute("SELECT role FROM userAuthentication WHERE id = ?", (user_id,))
     result = cursor.fetchone()
 
@@ -397,10 +607,72 @@ def delete_user(user_id):
     # Then delete user
     cursor.execute("DELETE FROM userAuthentication WHERE id = ?", (user_id,))
     conn.commit()
+    startup.ensure("face_index")
+    face_index.remove(user_id)
 
     return jsonify({"message": "User and related logs deleted successfully"}), 200
 
 
+@app.route("/admin/db-stats", methods=["GET"])
+def db_stats():
+    if session.get("role") != "admin":
+        return jsonify({"error": "Access denied"}), 403
+    return jsonify({**db_pool.stats(), "audit_log": audit_log.stats()})
+
+
+@app.route("/admin/compute-stats", methods=["GET"])
+def compute_pool_stats():
+    if session.get("role") != "admin":
+        return jsonify({"error": "Access denied"}), 403
+    return jsonify(compute_stats())
+
+
+@app.route("/admin/extraction-stats", methods=["GET"])
+def pdf_extraction_stats():
+    if session.get("role") != "admin":
+        return jsonify({"error": "Access denied"}), 403
+    return jsonify(extraction_stats())
+
+
+@app.route("/admin/rag-ingest-stats", methods=["GET"])
+def rag_ingest_stats():
+    if session.get("role") != "admin":
+        return jsonify({"error": "Access denied"}), 403
+    return jsonify(ingest_stats())
+
+
+@app.route("/admin/mail-stats", methods=["GET"])
+def mail_stats():
+    if session.get("role") != "admin":
+        return jsonify({"error": "Access denied"}), 403
+    return jsonify(mail_queue.stats())
+
+
+@app.route("/admin/mail/<message_id>", methods=["GET"])
+def mail_status(message_id):
+    if session.get("role") != "admin":
+        return jsonify({"error": "Access denied"}), 403
+    record = mail_queue.status(message_id)
+    if record is None:
+        return jsonify({"error": "Unknown or expired message id"}), 404
+    return jsonify(record)
+
+
+@app.route("/admin/models", methods=["GET"])
+def loaded_models():
+    if session.get("role") != "admin":
+        return jsonify({"error": "Access denied"}), 403
+    return jsonify({"sentence_models": model_stats(), "ocr": ocr_stats()})
+
+
+@app.route("/admin/cache-stats", methods=["GET"])
+def cache_stats():
+    if session.get("role") != "admin":
+        return jsonify({"error": "Access denied"}), 403
+    return jsonify({"llm": llm_cache_stats(), "documents": document_cache_stats(), "summary_nodes": summary_node_stats(),
+                    "rag_answers": answer_cache_stats()})
+
+
 # Store feedback
 @app.route('/api/feedback', methods=['POST'])
 def store_feedback():
@@ -412,6 +684,8 @@ def store_feedback():
     if not name or not email or not message:
         return jsonify({'error': 'Missing required fields'}), 400
 
+    conn = get_db()
+    cursor = conn.cursor()
     cursor.execute(
         "INSERT INTO Feedback (name, email, message) VALUES (?, ?, ?)",
         (name, email, message)
@@ -422,6 +696,7 @@ def store_feedback():
 # Retrieve all feedback
 @app.route('/api/feedback', methods=['GET'])
 def get_feedback():
+    cursor = get_db().cursor()
     cursor.execute("SELECT id, name, email, message, created_at FROM Feedback ORDER BY created_at DESC")
     rows = cursor.fetchall()
     feedbacks = [
@@ -437,19 +712,127 @@ def get_feedback():
     return jsonify(feedbacks)
 
 
+# -------------------------------
+# Background jobs for long-running document tasks
+# -------------------------------
+jobs = create_job_manager()
+
+def wants_async():
+    return request.args.get("async") == "1" or request.form.get("async") == "1"
+
+def buffered_upload(file):
+    # The request stream is closed once we respond, so a job or a streamed
+    # response gets its own copy
+    return FileStorage(stream=io.BytesIO(read_upload(file)), filename=file.filename)
+
+def submit_job(kind, fn, *args):
+    job_id = jobs.submit(kind, fn, *args, owner=session.get("user"))
+    return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+def _visible_job(job_id):
+    job = jobs.get(job_id)
+    if job is None or (job["owner"] and job["owner"] != session.get("user")):
+        return None
+    return job
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": {"done": job["done"], "total": job["total"], "message": job["message"]},
+        "error": job["error"],
+        "result_url": f"/jobs/{job_id}/result" if job["status"] == SUCCEEDED else None,
+    })
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or result expired"}), 404
+    if job["status"] not in FINISHED_STATES:
+        return jsonify({"error": "Job not finished", "status": job["status"]}), 409
+    if job["status"] != SUCCEEDED:
+        return jsonify({"error": job["error"] or "Job cancelled", "status": job["status"]}), 410
+    return jsonify(job["result"])
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    if _visible_job(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    if not jobs.cancel(job_id):
+        return jsonify({"error": "Job already finished"}), 409
+    return jsonify({"message": "Cancellation requested"}), 202
+
+# -------------------------------
+# Incremental (NDJSON) responses
+# -------------------------------
+# ?stream=1 (or Accept: application/x-ndjson) returns one JSON object per line:
+# a "chunk" event per chunk as soon as its LLM call finishes, then a "done" event
+# with the complete result, or an "error" event if the pipeline fails midway.
+# NDJSON over fetch() rather than SSE, because EventSource cannot POST an upload.
+
+def wants_stream():
+    return (request.args.get("stream") == "1"
+            or request.form.get("stream") == "1"
+            or "application/x-ndjson" in request.headers.get("Accept", ""))
+
+def ndjson_response(events):
+    def generate():
+        try:
+            for event in events:
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            print(f"❌ Stream failed: {e}")
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+
+    # stream_with_context keeps the request context alive while the body is sent,
+    # but Werkzeug has already closed the upload: pass buffered_upload(file) in
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def abstractive_job(ctx, file):
+    summary_text = abs_summarize(file, progress=ctx.progress)
+    if not summary_text.strip():
+        raise ValueError("Summary is empty")
+    return {"summary": summary_text}
+
+def notes_job(ctx, file):
+    final_notes = generate_note_from_file(file, progress=ctx.progress)
+    if not final_notes.strip():
+        raise ValueError("No notes generated")
+    return {"notes": final_notes}
+
+def qa_job(ctx, file, num_questions):
+    result, status = handle_qa_pipeline(file, num_questions, progress=ctx.progress)
+    if status != 200:
+        raise ValueError(result.get("error", "QA generation failed"))
+    return result
+
+def rag_job(ctx, file, question):
+    return {"answer": handle_rag_pipeline(file, question, progress=ctx.progress)}
+
+
 @app.route('/abstractive', methods=['POST'])
 def abstractive_summarize_api():
     if 'file' not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
     uploaded_file = request.files['file']
-    filename = secure_filename(uploaded_file.filename)
-    os.makedirs("temp", exist_ok=True)
-    temp_path = os.path.join("temp", filename)
-    uploaded_file.save(temp_path)
+    if wants_async():
+        return submit_job("abstractive", abstractive_job, buffered_upload(uploaded_file))
+    if wants_stream():
+        return ndjson_response(stream_summary(buffered_upload(uploaded_file)))
 
     try:
-        summary_text = abs_summarize(temp_path)
+        summary_text = abs_summarize(uploaded_file)
     except Exception as e:
         return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
@@ -467,12 +850,13 @@ def extractive_summarization():
     if uploaded_file.filename == "":
         return jsonify({"error": "No file selected"}), 400
 
+    # "chunk" (default) or "document": score sentences against the whole file
+    scope = request.form.get("scope", EXT_SUMMARY_SCOPE)
+    if scope not in ("chunk", "document"):
+        return jsonify({"error": "scope must be 'chunk' or 'document'"}), 400
+
     try:
-        filename = secure_filename(uploaded_file.filename)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-            uploaded_file.save(tmp.name)
-            summary = ext_summarize(tmp.name)
-        os.remove(tmp.name)
+        summary = ext_summarize(uploaded_file, scope)
         return jsonify({"summary": summary})
 
     except Exception as e:
@@ -496,11 +880,75 @@ def rag_endpoint():
             question = request.form.get('question')
             if not file or not question:
                 return jsonify({"error": "Both file and question are required."}), 400
+            if wants_async():
+                return submit_job("rag", rag_job, buffered_upload(file), question)
             answer = handle_rag_pipeline(file, question)
             return jsonify({"answer": answer})
         except Exception as e:
             return jsonify({"error": str(e)}), 500  
 
+# /rag needs the file itself with every question. With ingest-once/ask-many, a
+# doc_id is only readable by users who uploaded that file (and admins).
+def grant_document_access(doc_id, email):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        IF NOT EXISTS (SELECT 1 FROM RagDocumentAccess WHERE doc_id = ? AND user_email = ?)
+            INSERT INTO RagDocumentAccess (doc_id, user_email) VALUES (?, ?)
+    """, (doc_id, email, doc_id, email))
+    conn.commit()
+
+def can_read_documents(doc_ids, email, role):
+    if role == "admin":
+        return True
+    doc_ids = list(set(doc_ids))
+    cursor = get_db().cursor()
+    cursor.execute(
+        f"SELECT COUNT(*) FROM RagDocumentAccess WHERE user_email = ? AND doc_id IN ({', '.join('?' * len(doc_ids))})",
+        (email, *doc_ids),
+    )
+    return cursor.fetchone()[0] == len(doc_ids)
+
+# Ingest once, ask many: upload returns a doc_id to ask questions against
+@app.route('/rag/ingest', methods=['POST'])
+def rag_ingest():
+    if "user" not in session:
+        return jsonify({"error": "Login required"}), 401
+    file = request.files.get('file')
+    if not file:
+        return jsonify({"error": "No file uploaded"}), 400
+    try:
+        doc_id, created = ingest_document(file)
+        grant_document_access(doc_id, session["user"])
+        return jsonify({"doc_id": doc_id, "already_indexed": not created}), 201 if created else 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/rag/ask', methods=['POST'])
+def rag_ask():
+    if "user" not in session:
+        return jsonify({"error": "Login required"}), 401
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {"doc_ids": request.form.getlist("doc_id"), "question": request.form.get("question")}
+    # A single doc_id or a user-selected set of doc_ids
+    doc_ids = data.get('doc_ids') or ([data['doc_id']] if data.get('doc_id') else [])
+    question = data.get('question')
+    if not doc_ids or not question:
+        return jsonify({"error": "doc_id (or doc_ids) and question are required."}), 400
+    if isinstance(doc_ids, str):
+        doc_ids = [doc_ids]
+    try:
+        # Documents the user never uploaded look the same as unknown ones
+        if not can_read_documents(doc_ids, session["user"], session.get("role")):
+            raise KeyError("doc_id")
+        answer = answer_question(doc_ids, question)
+        return jsonify({"doc_ids": doc_ids, "answer": answer})
+    except KeyError:
+        return jsonify({"error": "Unknown document id. Upload it via /rag/ingest first."}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/generate-qa", methods=["POST"])
 def generate_qa_route():
     file = request.files.get("file")
@@ -512,6 +960,13 @@ def generate_qa_route():
         return jsonify({"error": "num_questions must be an integer"}), 400
 
     num_questions = int(num_qs)
+    if wants_async():
+        return submit_job("generate-qa", qa_job, buffered_upload(file), num_questions)
+    if wants_stream():
+        plan = plan_qa(file, num_questions)
+        if not plan:
+            return jsonify({"error": "Unsupported or empty file"}), 400
+        return ndjson_response(stream_qa(plan, num_questions))
     result, status = handle_qa_pipeline(file, num_questions)
     return jsonify(result), status
 
@@ -542,6 +997,10 @@ def handle_generate_notes():
     file = request.files.get("file")
     if not file:
         return jsonify({"error": "No file uploaded"}), 400
+    if wants_async():
+        return submit_job("notes", notes_job, buffered_upload(file))
+    if wants_stream():
+        return ndjson_response(stream_notes(buffered_upload(file)))
     try:
         final_notes = generate_note_from_file(file)
         if not final_notes.strip():
@@ -550,5 +1009,21 @@ def handle_generate_notes():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# -------------------------------
+# Health checks
+# -------------------------------
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the process is up and serving; never touches a dependency
+    return jsonify({"status": "ok", "uptime_seconds": round(startup.uptime(), 1)})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    ready = startup.is_ready()
+    body = {"ready": ready, "resources": startup.resource_status()}
+    return jsonify(body), 200 if ready else 503
+
+print(f"🚀 App imported in {time.perf_counter() - _import_started:.2f}s (warming up: {', '.join(WARMUP) or 'nothing'})")
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------- RAG ANSWER CACHE ----------------
+# Answers are cached per document set, in two levels:
+#   1. exact    - the normalised question text (no embedding needed)
+#   2. semantic - cosine similarity between the question's embedding (the one
+#                 search_chunks needs anyway) and earlier questions on the same
+#                 documents; above RAG_SEMANTIC_THRESHOLD the stored answer is reused
+# A doc_id is the hash of the file's content and a document is indexed once,
+# so its chunks never change under a cached answer; entries only expire (TTL)
+# or are evicted (LRU). Process-local (each worker keeps its own).
+
+RAG_ANSWER_CACHE = os.getenv("RAG_ANSWER_CACHE", "1") == "1"
+RAG_SEMANTIC_THRESHOLD = float(os.getenv("RAG_SEMANTIC_THRESHOLD", "0.92"))
+RAG_ANSWER_TTL = float(os.getenv("RAG_ANSWER_TTL", str(24 * 3600)))
+RAG_ANSWERS_PER_SCOPE = int(os.getenv("RAG_ANSWERS_PER_SCOPE", "256"))
+RAG_ANSWER_SCOPES = int(os.getenv("RAG_ANSWER_SCOPES", "1024"))
+
+
+def normalize_question(question):
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" ?.!")
+
+
+class _Scope:
+    """Cached answers for one document set: question -> (vector, answer, stored at)."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self._matrix = None  # stacked vectors of ``entries``, rebuilt after a change
+        self._keys = None
+
+    def add(self, key, vector, answer, max_entries):
+        self.entries.pop(key, None)
+        self.entries[key] = (vector, answer, time.time())
+        while len(self.entries) > max_entries:
+            self.entries.popitem(last=False)
+        self._matrix = None
+
+    def drop(self, key):
+        self.entries.pop(key, None)
+        self._matrix = None
+
+    def nearest(self, vector):
+        if self._matrix is None:
+            keyed = [(k, v) for k, (v, _, _) in self.entries.items() if v is not None]
+            if not keyed:
+                return None, 0.0
+            self._keys = [k for k, _ in keyed]
+            self._matrix = np.vstack([v for _, v in keyed])
+        # Embeddings are L2-normalised, so the dot product is the cosine similarity
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self._keys[best], float(scores[best])
+
+
+class AnswerCache:
+    def __init__(self, threshold=RAG_SEMANTIC_THRESHOLD, ttl=RAG_ANSWER_TTL,
+                 max_entries=RAG_ANSWERS_PER_SCOPE, max_scopes=RAG_ANSWER_SCOPES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self._scopes = OrderedDict()  # frozenset(doc_ids) -> _Scope, least recently used first
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+
+    @staticmethod
+    def scope_of(doc_ids):
+        return frozenset(doc_ids)
+
+    def _live(self, scope, key):
+        # Caller holds the lock
+        entries = self._scopes[scope].entries
+        vector, answer, stored = entries[key]
+        if self.ttl and stored + self.ttl < time.time():
+            self._scopes[scope].drop(key)
+            return None
+        entries.move_to_end(key)
+        self._scopes.move_to_end(scope)
+        return answer
+
+    def get_exact(self, scope, question):
+        key = normalize_question(question)
+        with self._lock:
+            self.lookups += 1
+            if scope in self._scopes and key in self._scopes[scope].entries:
+                answer = self._live(scope, key)
+                if answer is not None:
+                    self.exact_hits += 1
+                    return answer
+        return None
+
+    def get_similar(self, scope, vector):
+        # Counted as part of the lookup started by ``get_exact``
+        with self._lock:
+            if scope not in self._scopes:
+                return None
+            key, score = self._scopes[scope].nearest(vector)
+            if key is None or score < self.threshold:
+                return None
+            answer = self._live(scope, key)
+            if answer is not None:
+                self.semantic_hits += 1
+            return answer
+
+    def store(self, scope, question, vector, answer):
+        if not answer:
+            return
+        key = normalize_question(question)
+        vector = None if vector is None else np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None:
+                entry = self._scopes[scope] = _Scope()
+                while len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)
+            self._scopes.move_to_end(scope)
+            entry.add(key, vector, answer, self.max_entries)
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "enabled": RAG_ANSWER_CACHE,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.lookups - hits,
+                "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+                "exact_hit_rate": round(self.exact_hits / self.lookups, 4) if self.lookups else 0.0,
+                "semantic_hit_rate": round(self.semantic_hits / self.lookups, 4) if self.lookups else 0.0,
+                "scopes": len(self._scopes),
+                "entries": sum(len(s.entries) for s in self._scopes.values()),
+            }
+
+
+answer_cache = AnswerCache()
+
+
+def answer_cache_stats():
+    return answer_cache.stats()
@@ -0,0 +1,153 @@
+import os
+import threading
+from collections import deque
+from typing import NamedTuple
+
+# ---------------- SHARED CHUNKING ENGINE ----------------
+# Every pipeline chunks the same way: a stream of sentences (units) is packed
+# into chunks of at most ``max_tokens`` model tokens, each unit counted once
+# and kept in a running window, so the whole pass is linear in the document.
+# Overlap is whole trailing sentences carried into the next chunk (nothing is
+# re-split). Chunks carry unit offsets and references to the unit strings;
+# the text is only joined when ``.text`` is read.
+#
+# Sizes are in tokens of the model the chunk is for:
+#   "model:<name>" - exact count with that sentence-transformers model's tokenizer
+#   "estimate"     - ~4 characters per token (Gemini has no local tokenizer)
+#   "words"        - whitespace words
+
+
+class ChunkProfile(NamedTuple):
+    name: str
+    max_tokens: int
+    overlap: int
+    tokenizer: str
+
+
+class Chunk(NamedTuple):
+    start: int      # offset of the first unit in the unit stream
+    stop: int       # one past the last unit
+    tokens: int
+    parts: tuple    # the unit strings themselves (not copies)
+
+    @property
+    def text(self):
+        return " ".join(self.parts)
+
+
+def chunk_profile(name, max_tokens, overlap=0, tokenizer="estimate"):
+    # CHUNK_<NAME>_TOKENS / CHUNK_<NAME>_OVERLAP override a pipeline's defaults
+    key = name.upper()
+    max_tokens = int(os.getenv(f"CHUNK_{key}_TOKENS", str(max_tokens)))
+    overlap = int(os.getenv(f"CHUNK_{key}_OVERLAP", str(overlap)))
+    if not 0 <= overlap < max_tokens:
+        raise ValueError(f"Chunk overlap for '{name}' must be between 0 and max_tokens ({max_tokens})")
+    return ChunkProfile(name, max_tokens, overlap, tokenizer)
+
+
+# -------------------------------
+# 🔢 Token Counters
+# -------------------------------
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def _model_counter(name):
+    # The tokenizer comes with the (already cached) sentence model, so nothing extra is loaded
+    from app_modules.model_registry import get_sentence_model
+
+    tokenizer = get_sentence_model(name).tokenizer
+
+    def count(text):
+        return len(tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"])
+
+    return count
+
+
+_counters = {"estimate": estimate_tokens, "words": count_words}
+_counters_lock = threading.Lock()
+
+
+def get_counter(spec):
+    counter = _counters.get(spec)
+    if counter is None:
+        if not spec.startswith("model:"):
+            raise ValueError(f"Unknown tokenizer '{spec}' (expected 'estimate', 'words' or 'model:<name>')")
+        with _counters_lock:
+            counter = _counters.get(spec)
+            if counter is None:
+                counter = _counters[spec] = _model_counter(spec[len("model:"):])
+    return counter
+
+
+# -------------------------------
+# ✅ Engine
+# -------------------------------
+def _split_oversized(unit, tokens, max_tokens, count):
+    # A "sentence" longer than a whole chunk (e.g. OCR text without punctuation)
+    # is cut at word boundaries into roughly equal pieces that fit
+    words = unit.split()
+    pieces = min(len(words), -(-tokens // max_tokens))
+    if pieces <= 1:
+        yield unit, tokens
+        return
+    size = -(-len(words) // pieces)
+    for i in range(0, len(words), size):
+        piece = " ".join(words[i:i + size])
+        piece_tokens = count(piece)
+        if piece_tokens > max_tokens and size > 1:
+            yield from _split_oversized(piece, piece_tokens, max_tokens, count)
+        else:
+            yield piece, piece_tokens
+
+
+def _iter_units(units, max_tokens, count):
+    for unit in units:
+        if not unit:
+            continue
+        tokens = count(unit)
+        if tokens > max_tokens:
+            yield from _split_oversized(unit, tokens, max_tokens, count)
+        else:
+            yield unit, tokens
+
+
+def iter_chunks(units, profile):
+    """Pack a stream of sentences into ``Chunk``s as described by ``profile``.
+
+    Chunks are yielded as soon as they are full. Offsets index the unit stream
+    after oversized units have been split.
+    """
+    count = get_counter(profile.tokenizer)
+    max_tokens, overlap = profile.max_tokens, profile.overlap
+
+    window = deque()  # (unit, tokens) of the chunk being built
+    window_tokens = 0
+    start = 0         # offset of window[0]
+    emitted_stop = 0  # every unit before this offset is already in a chunk
+
+    for unit, tokens in _iter_units(units, max_tokens, count):
+        if window and window_tokens + tokens > max_tokens:
+            stop = start + len(window)
+            yield Chunk(start, stop, window_tokens, tuple(u for u, _ in window))
+            emitted_stop = stop
+            # Keep the trailing units that fit in the overlap and still leave room
+            budget = min(overlap, max_tokens - tokens)
+            while window and window_tokens > budget:
+                window_tokens -= window.popleft()[1]
+                start += 1
+        window.append((unit, tokens))
+        window_tokens += tokens
+
+    # The tail only matters if it holds units the last chunk did not
+    if window and start + len(window) > emitted_stop:
+        yield Chunk(start, start + len(window), window_tokens, tuple(u for u, _ in window))
+
+
+def chunk_texts(units, profile):
+    for chunk in iter_chunks(units, profile):
+        yield chunk.text
@@ -0,0 +1,71 @@
+import os
+
+from app_modules.cache import LRUCache, DiskCache, TieredCache
+from app_modules.extraction import iter_pages, iter_sentences, content_hash
+
+# ---------------- EXTRACTED TEXT CACHE ----------------
+# Users typically send the same file to several task endpoints in one session.
+# Raw pages, cleaned pages and sentence splits are cached by the upload's content
+# hash, so only the first endpoint pays for parsing and segmentation.
+#
+# Each cleaning variant is cached under its own name; pipelines whose cleaners
+# are equivalent share a name (and therefore share the cached segmentation).
+
+DOC_CACHE_MAX_MB = int(os.getenv("DOC_CACHE_MAX_MB", "256"))
+DOC_CACHE_DB = os.getenv("DOC_CACHE_DB")  # e.g. cache/documents.sqlite3; unset = memory only
+DOC_CACHE_DISK_MAX_MB = int(os.getenv("DOC_CACHE_DISK_MAX_MB", "1024"))
+DOC_CACHE_TTL = float(os.getenv("DOC_CACHE_TTL", str(24 * 3600)))
+
+
+def _text_bytes(value):
+    return sum(len(s) for s in value) + 64
+
+
+_cache = TieredCache(
+    LRUCache(max_entries=None, max_bytes=DOC_CACHE_MAX_MB * 1024 * 1024,
+             ttl=DOC_CACHE_TTL, sizeof=_text_bytes),
+    DiskCache(DOC_CACHE_DB, table="documents",
+              max_bytes=DOC_CACHE_DISK_MAX_MB * 1024 * 1024, ttl=DOC_CACHE_TTL)
+    if DOC_CACHE_DB else None,
+)
+
+
+def _recorded(key, source):
+    # Pass items through as they are produced; cache only a fully consumed stream
+    items = []
+    for item in source:
+        items.append(item)
+        yield item
+    _cache.set(key, items)
+
+
+def _cached_or(key, produce):
+    cached = _cache.get(key)
+    if cached is not None:
+        return iter(cached)
+    return _recorded(key, produce())
+
+
+def iter_cached_pages(file_storage, doc_hash=None):
+    doc_hash = doc_hash or content_hash(file_storage)
+    return _cached_or(f"{doc_hash}:pages", lambda: iter_pages(file_storage))
+
+
+def iter_cleaned_pages(file_storage, variant, cleaner, doc_hash=None):
+    doc_hash = doc_hash or content_hash(file_storage)
+    return _cached_or(
+        f"{doc_hash}:clean:{variant}",
+        lambda: (cleaner(page) for page in iter_cached_pages(file_storage, doc_hash)),
+    )
+
+
+def iter_cached_sentences(file_storage, variant, cleaner, doc_hash=None):
+    doc_hash = doc_hash or content_hash(file_storage)
+    return _cached_or(
+        f"{doc_hash}:sentences:{variant}",
+        lambda: iter_sentences(iter_cleaned_pages(file_storage, variant, cleaner, doc_hash)),
+    )
+
+
+def document_cache_stats():
+    return _cache.stats()
@@ -1,33 +1,15 @@
-import easyocr
-from PIL import Image
-import io
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from app_modules.llm_cache import generate_text
+from app_modules.gemini import get_model
+from app_modules.ocr import get_ocr_service
+from app_modules.image_ingest import read_image
 
-# Load environment variables
-load_dotenv()
-
-# Initialize EasyOCR reader
-reader = easyocr.Reader(['en'], gpu=False)
-
-# Configure Gemini
-GEMINI_API_KEY = os.getenv("API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('models/gemini-1.5-flash')
+SOLVE_PROMPT_VERSION = 1
 
 
 def extract_text_from_image(image_file):
-    image = Image.open(image_file.stream).convert("RGB")
-    img_bytes = io.BytesIO()
-    image.save(img_bytes, format="JPEG")
-    img_bytes.seek(0)
-    result = reader.readtext(img_bytes.read())
-    extracted_text = " ".join([text for (_, text, _) in result])
-    return extracted_text.strip()
+    return get_ocr_service().read_text(read_image(image_file))
 
 
 def solve_with_gemini(text):
     prompt = f"Interpret the following question (from text or OCR image), and provide a complete solution with explanation. If it’s a doubt, explain the underlying concept in a clear, subject-appropriate manner:\n\n{text}"
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return generate_text(get_model(), prompt, SOLVE_PROMPT_VERSION).strip()
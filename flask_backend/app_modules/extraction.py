@@ -0,0 +1,185 @@
+import io
+import os
+import codecs
+import hashlib
+
+# ---------------- SHARED DOCUMENT EXTRACTION ----------------
+# One extractor for every pipeline. Works on the upload stream directly (no temp
+# files) and yields text block by block - a PDF page, a DOCX paragraph or a run of
+# TXT lines - so callers can start cleaning/chunking before parsing finishes.
+# Blocks always end on a word boundary.
+
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "2000"))
+EXTRACT_MAX_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", str(50 * 1024 * 1024)))
+TXT_BLOCK_BYTES = 64 * 1024
+# Longest unfinished sentence held back for the next block (see iter_sentences)
+SENTENCE_CARRY_MAX = int(os.getenv("SENTENCE_CARRY_MAX", "4096"))
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+# Missing NLTK tokenizer data is fetched on first use, never at import; set to 0
+# on hosts without network access (install it with `python -m nltk.downloader punkt`)
+NLTK_AUTO_DOWNLOAD = os.getenv("NLTK_AUTO_DOWNLOAD", "1") == "1"
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+
+def file_extension(file_storage):
+    return os.path.splitext(file_storage.filename or "")[1].lower()
+
+
+def _stream(file_storage):
+    stream = getattr(file_storage, "stream", file_storage)
+    stream.seek(0)
+    return stream
+
+
+def content_hash(file_storage):
+    # SHA-256 of the upload bytes: the same file always maps to the same id
+    stream = _stream(file_storage)
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(1 << 20), b""):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def read_upload(file_storage, max_bytes=EXTRACT_MAX_BYTES):
+    data = _stream(file_storage).read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise DocumentTooLarge(f"File exceeds the {max_bytes // (1024 * 1024)} MB limit")
+    return data
+
+
+def _iter_pdf(file_storage, max_pages, max_bytes):
+    # Large PDFs are split across a process pool (see pdf_extraction)
+    from app_modules.pdf_extraction import iter_pdf_pages
+
+    yield from iter_pdf_pages(read_upload(file_storage, max_bytes), max_pages)
+
+
+def _iter_docx(file_storage, max_pages, max_bytes):
+    import docx
+
+    doc = docx.Document(io.BytesIO(read_upload(file_storage, max_bytes)))
+    for para in doc.paragraphs:
+        yield para.text
+
+
+def _iter_txt(file_storage, max_pages, max_bytes):
+    # Decode incrementally and cut blocks at line ends so no word spans two blocks
+    stream = _stream(file_storage)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    total = 0
+    while True:
+        block = stream.read(TXT_BLOCK_BYTES)
+        if not block:
+            break
+        total += len(block)
+        if total > max_bytes:
+            raise DocumentTooLarge(f"File exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        text = pending + decoder.decode(block)
+        cut = text.rfind("\n") + 1 or text.rfind(" ") + 1
+        if cut:
+            yield text[:cut]
+            pending = text[cut:]
+        else:
+            pending = text
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+_EXTRACTORS = {
+    ".pdf": _iter_pdf,
+    ".docx": _iter_docx,
+    ".txt": _iter_txt,
+}
+
+
+def iter_pages(file_storage, max_pages=EXTRACT_MAX_PAGES, max_bytes=EXTRACT_MAX_BYTES):
+    ext = file_extension(file_storage)
+    extractor = _EXTRACTORS.get(ext)
+    if extractor is None:
+        raise UnsupportedFileType(f"Unsupported file type '{ext}'. Please use PDF, DOCX, or TXT.")
+    return extractor(file_storage, max_pages, max_bytes)
+
+
+def extract_text(file_storage, sep="\n", **limits):
+    # str.join over the generator: linear in the document size
+    return sep.join(iter_pages(file_storage, **limits))
+
+
+# ---------------- INCREMENTAL SEGMENTATION ----------------
+
+_nltk_ready = set()
+
+
+def ensure_nltk_data(package="punkt", resource="tokenizers/punkt"):
+    if package in _nltk_ready:
+        return
+    import nltk
+
+    try:
+        nltk.data.find(resource)
+    except LookupError:
+        if not NLTK_AUTO_DOWNLOAD:
+            raise LookupError(f"NLTK data '{package}' is missing; run `python -m nltk.downloader {package}`")
+        print(f"⬇️  Downloading NLTK data '{package}'")
+        nltk.download(package, quiet=True)
+    _nltk_ready.add(package)
+
+
+def sent_tokenize(text):
+    ensure_nltk_data()
+    from nltk.tokenize import sent_tokenize as tokenize
+    return tokenize(text)
+
+
+def word_tokenize(text):
+    ensure_nltk_data()
+    from nltk.tokenize import word_tokenize as tokenize
+    return tokenize(text)
+
+
+def iter_sentences(blocks, tokenize=None):
+    """Yield sentences from a stream of text blocks.
+
+    The last sentence of each block is held back and prefixed to the next one, so
+    a sentence broken across a page boundary is still returned whole. Text
+    without sentence punctuation (slides, tables, OCR) would otherwise carry the
+    whole document forward and re-tokenize it for every block, so nothing is held
+    back when a block yields a single sentence or the carry exceeds SENTENCE_CARRY_MAX.
+    """
+    if tokenize is None:
+        tokenize = sent_tokenize
+
+    carry = ""
+    for block in blocks:
+        if not block or not block.strip():
+            continue
+        text = f"{carry} {block}" if carry else block
+        sentences = tokenize(text)
+        if not sentences:
+            continue
+        if len(sentences) == 1 or len(sentences[-1]) > SENTENCE_CARRY_MAX:
+            yield from sentences
+            carry = ""
+            continue
+        carry = sentences.pop()
+        yield from sentences
+    if carry:
+        yield carry
+
+
+def iter_words(blocks, tokenize=str.split):
+    # Every block ends on a word boundary (page, paragraph or line end)
+    for block in blocks:
+        if block:
+            yield from tokenize(block)
@@ -0,0 +1,49 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+# ---------------- GEMINI CLIENT ----------------
+# google.generativeai is imported and configured once, on the first LLM call,
+# instead of by every module at import. Model handles are cached by name.
+
+load_dotenv()
+
+DEFAULT_MODEL = "models/gemini-1.5-flash"
+
+_genai = None
+_models = {}
+_lock = threading.Lock()
+
+
+def _configure():
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                api_key = os.getenv("API_KEY")
+                if not api_key:
+                    raise ValueError("API_KEY for Gemini not found in environment variables")
+                import google.generativeai as genai
+
+                genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
+
+
+def get_model(name=DEFAULT_MODEL):
+    model = _models.get(name)
+    if model is None:
+        genai = _configure()
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                model = _models[name] = genai.GenerativeModel(name)
+    return model
+
+
+def is_configured():
+    return _genai is not None
+
+
+def warm_up():
+    get_model()
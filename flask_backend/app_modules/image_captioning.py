@@ -1,25 +1,12 @@
-import easyocr
-from PIL import Image
-import numpy as np
-import io
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+from app_modules.llm_cache import generate_text
+from app_modules.gemini import get_model
+from app_modules.ocr import get_ocr_service
+from app_modules.image_ingest import read_image
 
-load_dotenv()
-api_key = os.getenv("API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-genai.configure(api_key=api_key)
-
-reader = easyocr.Reader(['en'], gpu=False)
+CAPTION_PROMPT_VERSION = 1
 
 def generate_caption(image_file):
-    image = Image.open(image_file).convert("RGB")
-    image_np = np.array(image)  # For EasyOCR
-    
-    ocr_results = reader.readtext(image_np)
-    extracted_text = " ".join([res[1] for res in ocr_results if len(res) > 1]) or "No visible text detected"
+    extracted_text = get_ocr_service().read_text(read_image(image_file)) or "No visible text detected"
 
     prompt = f"""
 You are an advanced image captioning AI.
@@ -36,7 +23,4 @@ Extracted Text (if any):
 Now generate a context-aware, natural-sounding caption that reflects the content, purpose, and style of the image. Adjust length accordingly.
 """
 
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    response = model.generate_content(prompt)
-
-    return response.text.strip()
+    return generate_text(get_model("gemini-1.5-flash"), prompt, CAPTION_PROMPT_VERSION).strip()
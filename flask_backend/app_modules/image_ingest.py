@@ -0,0 +1,92 @@
+import io
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app_modules.ocr import OCR_MAX_SIDE
+
+# ---------------- IMAGE INGEST ----------------
+# Uploads are decoded exactly once, straight into an RGB numpy array sized for
+# OCR. Large JPEGs are decoded at 1/2, 1/4 or 1/8 scale by libjpeg itself
+# (IMREAD_REDUCED_*), so a 12 MP phone photo never exists at full size in memory.
+# Only the header is parsed by PIL, to read the dimensions and EXIF orientation.
+
+EXIF_ORIENTATION = 0x0112
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+_ORIENT = {
+    2: lambda img: cv2.flip(img, 1),
+    3: lambda img: cv2.rotate(img, cv2.ROTATE_180),
+    4: lambda img: cv2.flip(img, 0),
+    5: lambda img: cv2.transpose(img),
+    6: lambda img: cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE),
+    7: lambda img: cv2.rotate(cv2.transpose(img), cv2.ROTATE_180),
+    8: lambda img: cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE),
+}
+
+
+def _read_header(data):
+    try:
+        with Image.open(io.BytesIO(data)) as header:
+            return header.size, header.getexif().get(EXIF_ORIENTATION, 1)
+    except UnidentifiedImageError:
+        raise ValueError("Unsupported or corrupt image")
+
+
+def _decode_flag(size, max_side):
+    longest = max(size)
+    if max_side:
+        # Largest reduction that still leaves at least max_side pixels on the long edge
+        for factor, flag in _REDUCED_FLAGS:
+            if longest // factor >= max_side:
+                return flag
+    return cv2.IMREAD_COLOR
+
+
+def _cap(image, max_side):
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        return image
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def _decode_with_pil(data, max_side):
+    # Formats OpenCV cannot read (e.g. GIF); draft() is PIL's reduced JPEG decode
+    with Image.open(io.BytesIO(data)) as image:
+        if max_side:
+            image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        if max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        return np.asarray(image)
+
+
+def decode_image(data, max_side=OCR_MAX_SIDE):
+    """Decode encoded image bytes to an upright RGB uint8 array with its long side <= max_side."""
+    size, orientation = _read_header(data)
+    buffer = np.frombuffer(data, np.uint8)
+    # Orientation is applied below, after the reduced decode, on the smaller image
+    image = cv2.imdecode(buffer, _decode_flag(size, max_side) | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image is None:
+        return _decode_with_pil(data, max_side)
+
+    rotate = _ORIENT.get(orientation)
+    if rotate is not None:
+        image = rotate(image)
+    image = _cap(image, max_side)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+
+def read_image(file, max_side=OCR_MAX_SIDE):
+    # Accepts a Werkzeug FileStorage or any binary file object
+    stream = getattr(file, "stream", file)
+    return decode_image(stream.read(), max_side)
@@ -0,0 +1,86 @@
+import contextvars
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+from app_modules.cache import LRUCache, DiskCache, TieredCache
+
+# ---------------- LLM RESPONSE CACHE ----------------
+# Every prompt in this app is fully determined by its inputs, so responses are
+# keyed by a hash of (model, prompt template version, prompt, parameters).
+# Bump a module's *_PROMPT_VERSION when its template changes to retire old entries.
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MEMORY_MB = int(os.getenv("LLM_CACHE_MEMORY_MB", "64"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB")  # e.g. cache/llm_cache.sqlite3; unset = memory only
+LLM_CACHE_DISK_MAX_MB = int(os.getenv("LLM_CACHE_DISK_MAX_MB", "256"))
+
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+_cache = TieredCache(
+    LRUCache(max_entries=LLM_CACHE_MEMORY_ENTRIES,
+             max_bytes=LLM_CACHE_MEMORY_MB * 1024 * 1024, ttl=LLM_CACHE_TTL),
+    DiskCache(LLM_CACHE_DB, table="llm_responses",
+              max_bytes=LLM_CACHE_DISK_MAX_MB * 1024 * 1024, ttl=LLM_CACHE_TTL)
+    if LLM_CACHE_DB else None,
+)
+
+
+def cache_key(model_name, template_version, prompt, params=None):
+    payload = json.dumps(
+        [model_name, template_version, prompt, params or {}],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def set_bypass(value):
+    return _bypass.set(bool(value))
+
+
+def reset_bypass(token):
+    _bypass.reset(token)
+
+
+def cache_bypassed():
+    return _bypass.get()
+
+
+@contextmanager
+def bypass_cache():
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def generate_text(model, prompt, template_version, params=None):
+    """Return ``model.generate_content(prompt).text``, served from cache when possible.
+
+    Empty responses and exceptions are never cached.
+    """
+    model_name = getattr(model, "model_name", str(model))
+    key = cache_key(model_name, template_version, prompt, params)
+    use_cache = not _bypass.get()
+
+    if use_cache:
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+    if params:
+        response = model.generate_content(prompt, generation_config=params)
+    else:
+        response = model.generate_content(prompt)
+    text = response.text if response and response.text else ""
+
+    if text:
+        _cache.set(key, text)
+    return text
+
+
+def llm_cache_stats():
+    return _cache.stats()
@@ -0,0 +1,136 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# ---------------- SHARED LLM EXECUTOR ----------------
+# Every per-chunk Gemini call goes through one bounded thread pool so a single
+# large upload cannot open unbounded connections to the API, and all requests
+# in the process share the same concurrency budget.
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "1.0"))
+LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", "600"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm"
+                )
+    return _executor
+
+
+def call_with_retry(fn, *args, retries=LLM_MAX_RETRIES, backoff=LLM_RETRY_BACKOFF, deadline=None):
+    attempt = 0
+    while True:
+        try:
+            return fn(*args)
+        except Exception:
+            if attempt >= retries:
+                raise
+            # Exponential backoff with jitter, never sleeping past the request deadline
+            delay = backoff * (2 ** attempt) * (0.5 + random.random())
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            time.sleep(delay)
+            attempt += 1
+
+
+def iter_llm(fn, items_iter, retries=LLM_MAX_RETRIES, backoff=LLM_RETRY_BACKOFF,
+             timeout=LLM_REQUEST_DEADLINE, on_error=None, on_progress=None):
+    """Run ``fn(item)`` for every item on the shared pool, yielding ``(index, result)`` in completion order.
+
+    Results are yielded while ``items_iter`` is still producing, so the first one can be
+    sent to a client before the rest of the document has been read. ``on_error(index,
+    item, exc)`` may return a placeholder for a chunk that failed after all retries;
+    without it the first failure is raised. ``on_progress(done, total)`` is called after
+    each result is consumed (``total`` is None until the input is exhausted). Raises
+    ``LLMDeadlineExceeded`` if the whole batch is not done within ``timeout`` seconds.
+    Closing the generator early cancels every call that has not started.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    executor = get_executor()
+
+    items = []
+    futures = {}
+    pending = set()
+    completed = 0
+    total = None
+
+    def check_deadline():
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise LLMDeadlineExceeded(
+                f"{len(pending)} of {len(items)} LLM calls unfinished after {timeout}s"
+            )
+        return remaining
+
+    def finished(done):
+        nonlocal completed
+        for future in done:
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                if on_error is None:
+                    raise
+                result = on_error(i, items[i], e)
+            yield i, result
+            completed += 1
+            if on_progress is not None:
+                on_progress(completed, total)
+
+    # ``items_iter`` may be a generator (e.g. chunks produced while a PDF is still being
+    # parsed): each item is submitted as soon as it is produced. Each task runs in a
+    # copy of the caller's context so per-request flags (e.g. the LLM cache bypass)
+    # follow the work onto pool threads.
+    try:
+        for i, item in enumerate(items_iter):
+            items.append(item)
+            future = executor.submit(
+                contextvars.copy_context().run,
+                call_with_retry, fn, item, retries=retries, backoff=backoff, deadline=deadline,
+            )
+            futures[future] = i
+            pending.add(future)
+            check_deadline()
+            done = {f for f in pending if f.done()}
+            pending -= done
+            yield from finished(done)
+        total = len(items)
+
+        while pending:
+            done, pending = wait(pending, timeout=check_deadline(), return_when=FIRST_COMPLETED)
+            yield from finished(done)
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def map_llm(fn, items_iter, retries=LLM_MAX_RETRIES, backoff=LLM_RETRY_BACKOFF,
+            timeout=LLM_REQUEST_DEADLINE, on_error=None, on_result=None, on_progress=None):
+    """Run ``fn(item)`` for every item on the shared pool and return results in input order.
+
+    Same arguments as ``iter_llm``; ``on_result(index, result)`` is called as each chunk
+    completes, before ``on_progress``.
+    """
+    results = {}
+    for i, result in iter_llm(fn, items_iter, retries, backoff, timeout, on_error, on_progress):
+        results[i] = result
+        if on_result is not None:
+            on_result(i, result)
+    return [results[i] for i in range(len(results))]
@@ -0,0 +1,65 @@
+import threading
+import time
+
+# ---------------- SHARED MODEL REGISTRY ----------------
+# One SentenceTransformer instance per model name for the whole process,
+# loaded on first use (or by warm_up) and reused by every request.
+
+_models = {}
+_model_stats = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _model_memory_bytes(model):
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        return None
+
+
+def _load_lock(name):
+    with _registry_lock:
+        lock = _load_locks.get(name)
+        if lock is None:
+            lock = _load_locks[name] = threading.Lock()
+        return lock
+
+
+def get_sentence_model(name):
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    # Per-name lock so two cold models can load in parallel, but never the same one twice
+    with _load_lock(name):
+        model = _models.get(name)
+        if model is not None:
+            return model
+
+        from sentence_transformers import SentenceTransformer
+
+        start = time.perf_counter()
+        model = SentenceTransformer(name)
+        load_seconds = time.perf_counter() - start
+
+        _model_stats[name] = {
+            "load_seconds": round(load_seconds, 3),
+            "memory_bytes": _model_memory_bytes(model),
+            "loaded_at": time.time(),
+        }
+        _models[name] = model
+        print(f"🔹 Loaded model '{name}' in {load_seconds:.2f}s")
+        return model
+
+
+def warm_up(names):
+    for name in names:
+        try:
+            get_sentence_model(name)
+        except Exception as e:
+            print(f"❌ Warm-up failed for '{name}': {e}")
+
+
+def model_stats():
+    return {name: dict(stats) for name, stats in _model_stats.items()}
@@ -1,47 +1,9 @@
-import os
 import re
-import nltk
-import docx
-import fitz  # PyMuPDF
-import io
-import google.generativeai as genai
-from nltk.tokenize import sent_tokenize
-from dotenv import load_dotenv
-
-# Load env and configure
-load_dotenv()
-genai.configure(api_key=os.getenv("API_KEY"))
-nltk.download("punkt")
-
-# ---------------- TEXT EXTRACTION ----------------
-
-def extract_text(file_storage):
-    ext = os.path.splitext(file_storage.filename)[1].lower()
-
-    if ext == ".pdf":
-        return extract_text_from_pdf(file_storage)
-    elif ext == ".docx":
-        return extract_text_from_docx(file_storage)
-    elif ext == ".txt":
-        return file_storage.read().decode("utf-8")
-    else:
-        raise ValueError("Unsupported file type")
-
-
-def extract_text_from_pdf(file_storage):
-    text = ""
-    file_bytes = file_storage.read()
-    pdf_doc = fitz.open(stream=file_bytes, filetype="pdf")
-    for page in pdf_doc:
-        text += page.get_text() + "\n"
-    return text
-
-
-def extract_text_from_docx(file_storage):
-    file_bytes = file_storage.read()
-    doc = docx.Document(io.BytesIO(file_bytes))
-    return "\n".join([para.text for para in doc.paragraphs])
-
+from app_modules.document_cache import iter_cached_sentences
+from app_modules.llm_executor import map_llm, iter_llm
+from app_modules.llm_cache import generate_text
+from app_modules.gemini import get_model
+from app_modules.chunking import chunk_profile, chunk_texts
 
 # ---------------- CLEANING & CHUNKING ----------------
 
@@ -51,37 +13,21 @@ def clean_text(text):
     return text.strip()
 
 
-def chunk_text(text, chunk_size=4000, overlap=150):
-    sentences = sent_tokenize(text)
-    if not sentences:
-        return []
-
-    chunks = []
-    current_chunk = []
-    total_words = 0
+# ~4000 words per Gemini call, with ~150 words of trailing context carried over
+NOTES_CHUNKS = chunk_profile("notes", max_tokens=5300, overlap=200)
 
-    for sentence in sentences:
-        words = sentence.split()
-        if total_words + len(words) <= chunk_size:
-            current_chunk.append(sentence)
-            total_words += len(words)
-        else:
-            chunks.append(" ".join(current_chunk))
-            all_words = " ".join(current_chunk).split()
-            overlap_words = all_words[-overlap:] if len(all_words) >= overlap else all_words
-            current_chunk = [" ".join(overlap_words), sentence]
-            total_words = len(overlap_words) + len(words)
 
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-
-    return chunks
+def chunk_text(sentences, profile=NOTES_CHUNKS):
+    # Consumes sentences lazily and yields each chunk as soon as it is full
+    return chunk_texts(sentences, profile)
 
 
 # ---------------- GEMINI NOTE GENERATION ----------------
 
+NOTES_PROMPT_VERSION = 1
+
 def generate_notes(chunk):
-    model = genai.GenerativeModel("models/gemini-1.5-flash")
+    model = get_model()
     prompt = (
         """You are a highly knowledgeable academic assistant.
         Your task is to generate concise, structured, and exam-focused study notes from the following academic or textbook content.
@@ -109,31 +55,46 @@ def generate_notes(chunk):
         "Now generate clean, organized, and easy-to-revise study notes based on the above content. Use academic tone and clarity."
     )
 
-    try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
-        print(f"❌ Gemini generation failed: {e}")
-        return "[Error generating notes for this chunk]"
+    return generate_text(model, prompt, NOTES_PROMPT_VERSION).strip()
+
+
+def _note_error(index, chunk, exc):
+    print(f"❌ Gemini generation failed for chunk {index+1}: {exc}")
+    return "[Error generating notes for this chunk]"
 
 
 # ---------------- MAIN ENTRY ----------------
 
-def generate_note_from_file(file_storage):
-    # Reset file pointer before each read (important for Flask FileStorage)
-    file_storage.stream.seek(0)
-    raw = extract_text(file_storage)
+def _note_chunks(file_storage):
+    # Pages are cleaned and chunked as they are parsed; each chunk is sent to
+    # Gemini as soon as it is complete.
+    # Same whitespace normalisation as /extractive and /abstractive, so the
+    # sentence split is shared with them through the document cache
+    return chunk_text(iter_cached_sentences(file_storage, "whitespace", clean_text))
+
 
-    file_storage.stream.seek(0)  # Reset again for DOCX/PDF reads if needed
-    cleaned = clean_text(raw)
-    chunks = chunk_text(cleaned)
+def generate_note_from_file(file_storage, progress=None):
+    chunks = _note_chunks(file_storage)
 
-    all_notes = []
     print("📘 Generating notes...")
 
-    for i, chunk in enumerate(chunks):
-        print(f"➡️  Processing chunk {i+1}/{len(chunks)}")
-        notes = generate_notes(chunk)
-        all_notes.append(notes)
+    def log_chunk(i, _):
+        print(f"➡️  Finished chunk {i+1}")
+
+    def report(done, total):
+        if progress is not None:
+            progress(done, total, f"chunk {done}/{total or '?'}")
+
+    all_notes = map_llm(generate_notes, chunks, on_error=_note_error, on_result=log_chunk, on_progress=report)
 
     return "\n\n".join(all_notes)
+
+
+def stream_notes(file_storage):
+    # Yields each chunk's notes as soon as Gemini returns them (completion order,
+    # tagged with the chunk index), then the assembled notes in document order.
+    notes = {}
+    for i, note in iter_llm(generate_notes, _note_chunks(file_storage), on_error=_note_error):
+        notes[i] = note
+        yield {"event": "chunk", "index": i, "notes": note}
+    yield {"event": "done", "total": len(notes), "notes": "\n\n".join(notes[i] for i in sorted(notes))}
@@ -0,0 +1,238 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+# ---------------- SHARED OCR SERVICE ----------------
+# One EasyOCR reader per process, created on first use and shared by doubt
+# solving and image captioning. Requests from concurrent threads are queued
+# and handled by a single worker in micro-batches: the model is never driven
+# from two threads at once, and images of the same (downscaled) shape go
+# through the text detector in one forward pass.
+
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "en").split(",")
+OCR_GPU = os.getenv("OCR_GPU", "0") == "1"
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "1600"))  # 0 = never downscale
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "8"))
+OCR_BATCH_WAIT = float(os.getenv("OCR_BATCH_WAIT", "0.02"))  # seconds to wait for a batch to fill
+OCR_RECOGNIZE_BATCH = int(os.getenv("OCR_RECOGNIZE_BATCH", "16"))  # text crops per recogniser call
+
+
+def to_rgb_array(image):
+    """Accepts a numpy array (RGB / grayscale / RGBA), a PIL image, or encoded bytes."""
+    if isinstance(image, np.ndarray):
+        array = image
+    elif isinstance(image, (bytes, bytearray)):
+        array = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+        if array is None:
+            raise ValueError("Could not decode image")
+        return cv2.cvtColor(array, cv2.COLOR_BGR2RGB)
+    else:
+        array = np.asarray(image.convert("RGB"))
+
+    if array.ndim == 2:
+        return cv2.cvtColor(array, cv2.COLOR_GRAY2RGB)
+    if array.shape[2] == 4:
+        return cv2.cvtColor(array, cv2.COLOR_RGBA2RGB)
+    return array
+
+
+def downscale(image, max_side=OCR_MAX_SIDE):
+    # Detection cost grows with pixel count; text stays legible well below camera resolution
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        return image, False
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), True
+
+
+class OCRService:
+    def __init__(self, languages=OCR_LANGUAGES, gpu=OCR_GPU, max_side=OCR_MAX_SIDE,
+                 batch_size=OCR_BATCH_SIZE, batch_wait=OCR_BATCH_WAIT,
+                 recognize_batch=OCR_RECOGNIZE_BATCH):
+        self.languages = languages
+        self.gpu = gpu
+        self.max_side = max_side
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.recognize_batch = recognize_batch
+
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "load_seconds": None,
+            "images": 0,
+            "batches": 0,
+            "downscaled": 0,
+            "detector_passes": 0,
+            "preprocess_seconds": 0.0,
+            "detect_seconds": 0.0,
+            "recognize_seconds": 0.0,
+            "failed_batches": 0,
+            "failed_images": 0,
+        }
+
+    # ---------- lifecycle ----------
+    def get_reader(self):
+        if self._reader is None:
+            with self._reader_lock:
+                if self._reader is None:
+                    import easyocr
+
+                    start = time.perf_counter()
+                    self._reader = easyocr.Reader(self.languages, gpu=self.gpu)
+                    load_seconds = time.perf_counter() - start
+                    self._stats["load_seconds"] = round(load_seconds, 3)
+                    print(f"🔹 Loaded EasyOCR {self.languages} in {load_seconds:.2f}s")
+        return self._reader
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="ocr-batcher", daemon=True)
+                    self._worker.start()
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    # ---------- public API ----------
+    def readtext_batch(self, images):
+        """OCR several images; returns one EasyOCR result list ``[(box, text, confidence), ...]`` per image.
+
+        Safe to call from any thread. Boxes are in the coordinates of the image that was
+        passed in, even if it was downscaled for detection.
+        """
+        start = time.perf_counter()
+        prepared = []
+        for image in images:
+            rgb = to_rgb_array(image)
+            small, scaled = downscale(rgb, self.max_side)
+            ratio = rgb.shape[1] / small.shape[1] if scaled else 1.0
+            prepared.append((small, ratio))
+        self._count(preprocess_seconds=time.perf_counter() - start,
+                    downscaled=sum(1 for _, ratio in prepared if ratio != 1.0))
+
+        self._ensure_worker()
+        futures = []
+        for small, ratio in prepared:
+            future = Future()
+            self._queue.put((small, ratio, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def readtext(self, image):
+        return self.readtext_batch([image])[0]
+
+    def read_text(self, image):
+        return " ".join(text for _, text, _ in self.readtext(image)).strip()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        images = stats["images"]
+        stats["queued"] = self._queue.qsize()
+        stats["avg_batch_size"] = round(images / stats["batches"], 2) if stats["batches"] else None
+        stats["avg_detect_ms"] = round(stats["detect_seconds"] * 1000 / images, 1) if images else None
+        stats["avg_recognize_ms"] = round(stats["recognize_seconds"] * 1000 / images, 1) if images else None
+        return stats
+
+    # ---------- batch worker ----------
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self._process(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch[0], e)
+                    continue
+                # One bad image must not fail the other users' requests batched with
+                # it: retry one by one so only the image that really errors fails
+                print(f"⚠️  OCR batch of {len(batch)} failed ({e}); retrying images one at a time")
+                self._count(failed_batches=1)
+                for item in batch:
+                    try:
+                        item[2].set_result(self._process([item])[0])
+                    except Exception as item_error:
+                        self._fail(item, item_error)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _fail(self, item, error):
+        print(f"❌ OCR failed for one image: {error}")
+        self._count(failed_images=1)
+        item[2].set_exception(error)
+
+    def _process(self, batch):
+        reader = self.get_reader()
+        images = [image for image, _, _ in batch]
+
+        # ---- detection: one forward pass per group of identically shaped images ----
+        start = time.perf_counter()
+        boxes = [None] * len(images)
+        groups = {}
+        for i, image in enumerate(images):
+            groups.setdefault(image.shape, []).append(i)
+        for indices in groups.values():
+            stacked = images[indices[0]] if len(indices) == 1 else np.stack([images[i] for i in indices])
+            horizontal, free = reader.detect(stacked, reformat=False)
+            for i, h, f in zip(indices, horizontal, free):
+                boxes[i] = (h, f)
+        detect_seconds = time.perf_counter() - start
+
+        # ---- recognition: text crops per image, batched inside the recogniser ----
+        start = time.perf_counter()
+        results = []
+        for (image, ratio, _), (horizontal, free) in zip(batch, boxes):
+            grey = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+            result = reader.recognize(grey, horizontal, free, batch_size=self.recognize_batch, reformat=False)
+            if ratio != 1.0:
+                result = [([[x * ratio, y * ratio] for x, y in box], text, conf) for box, text, conf in result]
+            results.append(result)
+        recognize_seconds = time.perf_counter() - start
+
+        self._count(images=len(batch), batches=1, detector_passes=len(groups),
+                    detect_seconds=detect_seconds, recognize_seconds=recognize_seconds)
+        return results
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_ocr_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = OCRService()
+    return _service
+
+
+def ocr_stats():
+    return _service.stats() if _service is not None else {"load_seconds": None, "images": 0}
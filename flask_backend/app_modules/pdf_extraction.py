@@ -0,0 +1,205 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------------- PARALLEL PDF EXTRACTION ----------------
+# Large PDFs are split into page ranges that a process pool extracts in
+# parallel. The upload is written once to a temp file that every worker opens
+# itself (the OS page cache shares it), so only page numbers go to the workers
+# and only text comes back. Pages are still yielded in document order, as soon
+# as the range holding them is done. Below PDF_PARALLEL_MIN_PAGES, or with
+# PDF_WORKERS <= 1, extraction stays serial in the calling thread.
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+PDF_TMP_DIR = os.getenv("PDF_TMP_DIR") or None  # default: the system temp dir
+
+
+def _fitz():
+    import fitz  # PyMuPDF
+
+    return fitz
+
+
+# -------------------------------
+# 🧠 Worker side
+# -------------------------------
+_worker_doc = None  # (path, document): a worker usually gets several ranges of the same file
+
+
+def _open_in_worker(path):
+    global _worker_doc
+    if _worker_doc is not None and _worker_doc[0] == path:
+        return _worker_doc[1]
+    if _worker_doc is not None:
+        _worker_doc[1].close()
+    _worker_doc = (path, _fitz().open(path, filetype="pdf"))
+    return _worker_doc[1]
+
+
+def _extract_range(path, start, stop):
+    began = time.perf_counter()
+    doc = _open_in_worker(path)
+    texts = [doc[i].get_text() for i in range(start, stop)]
+    return texts, time.perf_counter() - began, os.getpid()
+
+
+# -------------------------------
+# 📊 Stats
+# -------------------------------
+class ExtractionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.serial = {"documents": 0, "pages": 0, "seconds": 0.0}
+        self.parallel = {"documents": 0, "pages": 0, "seconds": 0.0}
+        self.workers = {}  # pid -> {"pages", "seconds"} of busy time
+
+    def record(self, mode, pages, seconds):
+        with self._lock:
+            totals = self.serial if mode == "serial" else self.parallel
+            totals["documents"] += 1
+            totals["pages"] += pages
+            totals["seconds"] += seconds
+
+    def record_worker(self, pid, pages, seconds):
+        with self._lock:
+            worker = self.workers.setdefault(pid, {"pages": 0, "seconds": 0.0})
+            worker["pages"] += pages
+            worker["seconds"] += seconds
+
+    def snapshot(self):
+        def rate(entry):
+            return round(entry["pages"] / entry["seconds"], 1) if entry["seconds"] else None
+
+        with self._lock:
+            modes = {name: dict(totals) for name, totals in (("serial", self.serial), ("parallel", self.parallel))}
+            workers = {pid: dict(w) for pid, w in self.workers.items()}
+        for totals in modes.values():
+            totals["pages_per_second"] = rate(totals)
+            totals["seconds"] = round(totals["seconds"], 3)
+        return {
+            "workers": PDF_WORKERS,
+            "parallel_min_pages": PDF_PARALLEL_MIN_PAGES,
+            "pages_per_task": PDF_PAGES_PER_TASK,
+            **modes,
+            # Busy time per worker process: pages/second here is the per-core rate
+            "per_core": {
+                str(pid): {"pages": w["pages"], "seconds": round(w["seconds"], 3), "pages_per_second": rate(w)}
+                for pid, w in workers.items()
+            },
+        }
+
+
+_stats = ExtractionStats()
+
+
+# -------------------------------
+# ✅ Pool
+# -------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pdf_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # fork, as for the face workers: spawn and forkserver would re-import the Flask app module
+                _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("fork"))
+    return _pool
+
+
+def parallel_enabled():
+    return PDF_WORKERS > 1
+
+
+def _forget_pool():
+    # A pool inherited across a fork is unusable in the child; it makes its own on first use
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_pool)
+
+
+def start_pdf_workers():
+    """Create the PDF pool and start its workers (the "pdf_workers" startup
+    resource); returns a future, or None when PDF_WORKERS <= 1."""
+    if parallel_enabled():
+        return get_pdf_pool().submit(os.getpid)
+    return None
+
+
+# -------------------------------
+# ✅ Extraction
+# -------------------------------
+def _iter_serial(doc, page_count):
+    start = time.perf_counter()
+    for i in range(page_count):
+        yield doc[i].get_text()
+    _stats.record("serial", page_count, time.perf_counter() - start)
+
+
+def _iter_parallel(data, page_count):
+    start = time.perf_counter()
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=PDF_TMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        pool = get_pdf_pool()
+        ranges = deque(
+            (first, min(first + PDF_PAGES_PER_TASK, page_count))
+            for first in range(0, page_count, PDF_PAGES_PER_TASK)
+        )
+        # Keep a couple of ranges per worker in flight, so a slow consumer does
+        # not make the workers pile up the text of the whole document
+        in_flight = deque()
+        max_in_flight = PDF_WORKERS * 2
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < max_in_flight:
+                    first, stop = ranges.popleft()
+                    in_flight.append((stop - first, pool.submit(_extract_range, path, first, stop)))
+                pages, future = in_flight.popleft()
+                texts, seconds, pid = future.result()
+                _stats.record_worker(pid, pages, seconds)
+                yield from texts
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    seconds = time.perf_counter() - start
+    _stats.record("parallel", page_count, seconds)
+    print(f"📄 Extracted {page_count} PDF pages on {PDF_WORKERS} workers in {seconds:.2f}s "
+          f"({page_count / seconds:.0f} pages/s)")
+
+
+def iter_pdf_pages(data, max_pages):
+    """Yield the text of each page of the PDF in ``data``, in order."""
+    fitz = _fitz()
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page_count = doc.page_count
+        if page_count > max_pages:
+            print(f"⚠️  Stopped after {max_pages} pages")
+            page_count = max_pages
+        if not parallel_enabled() or page_count < PDF_PARALLEL_MIN_PAGES:
+            yield from _iter_serial(doc, page_count)
+            return
+    yield from _iter_parallel(data, page_count)
+
+
+def extraction_stats():
+    return _stats.snapshot()
@@ -1,50 +1,30 @@
-import os
 import re
 from flask import Flask
 from flask_cors import CORS
-from docx import Document
-import fitz  # PyMuPDF
-import google.generativeai as genai
-from dotenv import load_dotenv
+from app_modules.llm_executor import map_llm, iter_llm
+from app_modules.llm_cache import generate_text
+from app_modules.gemini import get_model
+from app_modules.extraction import UnsupportedFileType
+from app_modules.document_cache import iter_cached_sentences
+from app_modules.chunking import chunk_profile, chunk_texts
 
-# --- Load env + configure Gemini ---
-load_dotenv()
-genai.configure(api_key=os.getenv("API_KEY"))
-model = genai.GenerativeModel("models/gemini-1.5-flash")
+QA_PROMPT_VERSION = 1
 
 # --- Flask setup ---
 app = Flask(__name__)
 CORS(app)
 
 # --- Core Logic Functions ---
-def extract_text(file):
-    filename = file.filename.lower()
-    if filename.endswith(".pdf"):
-        doc = fitz.open(stream=file.read(), filetype="pdf")
-        return "\n".join(page.get_text() for page in doc)
-    elif filename.endswith(".docx"):
-        doc = Document(file)
-        return "\n".join(p.text for p in doc.paragraphs)
-    elif filename.endswith(".txt"):
-        return file.read().decode("utf-8")
-    return None
-
 def clean_text(text):
     text = re.sub(r"\s+", " ", text)
     text = re.sub(r"[^a-zA-Z0-9.,;!?()\"'’“”\- ]", "", text)
     return text.strip()
 
-def chunk_text(text, max_words=4000, overlap=100):
-    words = text.split()
-    chunks = []
-
-    i = 0
-    while i < len(words):
-        chunk = words[i:i + max_words]
-        chunks.append(" ".join(chunk))
-        i += max_words - overlap  # move forward with overlap
+# ~4000 words per Gemini call, ~100 words of overlap
+QA_CHUNKS = chunk_profile("qa", max_tokens=5300, overlap=130)
 
-    return chunks
+def chunk_text(sentences, profile=QA_CHUNKS):
+    return chunk_texts(sentences, profile)
 
 def generate_qa(text_chunk, num_questions):
     prompt = f"""
@@ -85,45 +65,71 @@ Content:
 Now generate exactly {num_questions} question-answer pairs for each difficulty level (basic, intermediate, advanced), for a total of {num_questions * 3} Q&A pairs.
 
 """
+    output = generate_text(get_model(), prompt, QA_PROMPT_VERSION).strip()
+
+    # print("Gemini Output:\n", output)  # DEBUG LOG
+
+    # Extract Q&A pairs
+    qa_pattern = re.findall(r"Q\d+:\s*(.*?)\s*A\d+:\s*(.*?)(?:\*\*?.*?Level\*\*?|🔹 Easy Level|🔸 Medium Level|🔴 Hard Level)?(?=\nQ\d+:|\Z)", output, re.DOTALL)
+    if qa_pattern:
+        return [{"question": q.strip(), "answer": a.strip()} for q, a in qa_pattern]
+    else:
+        return [{"question": "Could not parse output", "answer": output}]
+
+def split_question_budget(num_chunks, num_questions):
+    # Spread the questions evenly over the document so every chunk's request
+    # is known up front and all of them can run in parallel.
+    if num_chunks <= 0 or num_questions <= 0:
+        return []
+    used = min(num_chunks, num_questions)
+    if used == 1:
+        picks = [0]
+    else:
+        step = (num_chunks - 1) / (used - 1)
+        picks = [round(i * step) for i in range(used)]
+    base, extra = divmod(num_questions, used)
+    return [(idx, base + (1 if j < extra else 0)) for j, idx in enumerate(picks)]
+
+# --- Main Pipeline Function (called by route) ---
+def plan_qa(file, num_questions):
+    # Returns the (chunk text, questions per level) requests, or [] for an unsupported/empty file
     try:
-        response = model.generate_content(prompt)
-        output = response.text.strip() if response and response.text else ""
+        chunks = list(chunk_text(iter_cached_sentences(file, "qa", clean_text)))
+    except UnsupportedFileType:
+        return []
+    return [(chunks[idx], n) for idx, n in split_question_budget(len(chunks), num_questions)]
 
-        # print("Gemini Output:\n", output)  # DEBUG LOG
+def _qa_request(job):
+    return generate_qa(*job)
 
-        # Extract Q&A pairs
-        qa_pattern = re.findall(r"Q\d+:\s*(.*?)\s*A\d+:\s*(.*?)(?:\*\*?.*?Level\*\*?|🔹 Easy Level|🔸 Medium Level|🔴 Hard Level)?(?=\nQ\d+:|\Z)", output, re.DOTALL)
-        if qa_pattern:
-            return [{"question": q.strip(), "answer": a.strip()} for q, a in qa_pattern]
-        else:
-            return [{"question": "Could not parse output", "answer": output}]
-    except Exception as e:
-        return [{"question": "Error", "answer": str(e)}]
+def _qa_error(i, job, e):
+    return [{"question": "Error", "answer": str(e)}]
 
-# --- Main Pipeline Function (called by route) ---
-def handle_qa_pipeline(file, num_questions):
-    raw_text = extract_text(file)
-    if not raw_text:
+def handle_qa_pipeline(file, num_questions, progress=None):
+    plan = plan_qa(file, num_questions)
+    if not plan:
         return {"error": "Unsupported or empty file"}, 400
 
-    cleaned = clean_text(raw_text)
-    chunks = chunk_text(cleaned)
-    qa_pairs = []
-
-    for chunk in chunks:
-        remaining = num_questions - len(qa_pairs)
-        if remaining <= 0:
-            break  # already got enough QAs
-
-        raw_pairs = generate_qa(chunk, remaining)
-        qa_pairs.extend(raw_pairs)
+    results = map_llm(
+        _qa_request,
+        plan,
+        on_error=_qa_error,
+        on_progress=(lambda done, total: progress(done, total, f"chunk {done}/{total}")) if progress else None,
+    )
+    qa_pairs = [pair for pairs in results for pair in pairs]
 
     # Trim extra if Gemini generated more
     qa_pairs = qa_pairs[:num_questions * 3]
 
     return {"qa_pairs": qa_pairs}, 200
 
-
-
-
-
+def stream_qa(plan, num_questions):
+    # Yields each chunk's pairs as soon as they are generated, then the full
+    # ordered list. Each chunk is trimmed to its own share of the budget so the
+    # streamed pairs never exceed what the final list contains.
+    results = {}
+    for i, pairs in iter_llm(_qa_request, plan, on_error=_qa_error):
+        results[i] = pairs[:plan[i][1] * 3]
+        yield {"event": "chunk", "index": i, "total": len(plan), "qa_pairs": results[i]}
+    qa_pairs = [pair for i in sorted(results) for pair in results[i]]
+    yield {"event": "done", "total": len(plan), "qa_pairs": qa_pairs[:num_questions * 3]}
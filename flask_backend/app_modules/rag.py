@@ -1,45 +1,33 @@
-import os
 import re
-import fitz
-import nltk
-import docx2txt
+import threading
 import unicodedata
-import numpy as np
-from nltk.tokenize import word_tokenize
-from flask import request, jsonify
-from pymilvus import connections
-from sentence_transformers import SentenceTransformer
-import google.generativeai as genai
-from db_setup import create_milvus_collection, insert_and_index_chunks
+from contextlib import contextmanager, nullcontext
+from app_modules.model_registry import get_sentence_model
+from app_modules.llm_cache import generate_text, cache_bypassed
+from app_modules.answer_cache import answer_cache, RAG_ANSWER_CACHE
+from app_modules.gemini import get_model
+from app_modules.extraction import content_hash
+from app_modules.document_cache import iter_cached_sentences
+from app_modules.chunking import chunk_profile, chunk_texts
+from db_setup import (
+    connect_milvus, create_milvus_collection, create_manifest_collection, ensure_indexes, is_document_indexed,
+    has_document_rows, delete_document, document_filter, CollectionConfig, READ_CONSISTENCY, TEXT_MAX_LENGTH,
+)
+from milvus_ingest import IngestService
 
-nltk.download("punkt")
+EMBEDDING_MODEL_NAME = "sentence-transformers/multi-qa-MiniLM-L6-cos-v1"
+RAG_PROMPT_VERSION = 1
+# Counted with the embedding model's own tokenizer, well inside its 512-token input
+RAG_CHUNKS = chunk_profile("rag", max_tokens=384, overlap=64, tokenizer=f"model:{EMBEDDING_MODEL_NAME}")
 
-# Load environment variables and connect to Milvus
-genai.configure(api_key=os.getenv("API_KEY"))
-connections.connect("default", host="localhost", port="19530")
-
-COLLECTION_NAME = "rag_docs"
-EMBEDDING_DIM = 768
-
-
-def extract_text_from_file(path):
-    ext = os.path.splitext(path)[1].lower()
-    text = ""
-    try:
-        if ext == '.pdf':
-            with fitz.open(path) as doc:
-                for page in doc:
-                    text += page.get_text()
-        elif ext == '.docx':
-            text = docx2txt.process(path)
-        elif ext == '.txt':
-            with open(path, 'r', encoding='utf-8') as f:
-                text = f.read()
-        else:
-            raise ValueError(f"Unsupported file format: {ext}")
-    except Exception as e:
-        print(f"[ERROR] Failed to extract text: {e}")
-    return text
+_collection = None
+_manifest = None  # doc_ids whose ingest finished (see milvus_ingest)
+_collection_config = None
+_collection_lock = threading.Lock()
+_indexed_docs = set()
+_ingest_locks = {}  # doc_id -> [lock, threads holding or waiting for it]
+_document_lock = None  # doc_id -> context manager shared by all processes (see set_document_lock)
+_ingest_service = IngestService()
 
 
 def clean_extracted_text(raw_text):
@@ -52,30 +40,51 @@ def clean_extracted_text(raw_text):
     return text.strip()
 
 
-def chunk_text(text, chunk_size=300, overlap=50):
-    words = word_tokenize(text)
-    chunks = []
-    step = chunk_size - overlap
-    for i in range(0, len(words), step):
-        chunk = words[i:i + chunk_size]
-        chunks.append(" ".join(chunk))
-    return chunks
+def _fit_text_field(text, limit=TEXT_MAX_LENGTH):
+    # Cleaned text is ASCII, so characters are bytes. Split at spaces rather than
+    # clip, so every piece is embedded and stored as the same text
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        yield text[:cut]
+        text = text[cut:].lstrip()
+    if text:
+        yield text
+
+
+def chunk_text(sentences, profile=RAG_CHUNKS):
+    for text in chunk_texts(sentences, profile):
+        if len(text) > TEXT_MAX_LENGTH:
+            print(f"⚠️  Split a {len(text)}-character RAG chunk to fit the {TEXT_MAX_LENGTH}-byte text field")
+            yield from _fit_text_field(text)
+        else:
+            yield text
 
 
 def get_qa_embeddings(chunks):
-    model = SentenceTransformer('sentence-transformers/multi-qa-MiniLM-L6-cos-v1')
+    model = get_sentence_model(EMBEDDING_MODEL_NAME)
     embeddings = model.encode(chunks, convert_to_numpy=True, normalize_embeddings=True)
     return embeddings.tolist()
 
 
-def search_chunks(collection, query, top_k=3):
-    vector = get_qa_embeddings([query])[0]
+def embed_query(query):
+    model = get_sentence_model(EMBEDDING_MODEL_NAME)
+    return model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0]
+
+
+def search_chunks(collection, query, doc_ids, top_k=3, vector=None):
+    # Always scoped to the given documents; callers check the user may read them
+    if vector is None:
+        vector = embed_query(query)
     results = collection.search(
-        data=[vector],
+        data=[vector.tolist()],
         anns_field="embedding",
-        param={"metric_type": "L2", "params": {"nprobe": 10}},
+        param=get_collection_config().search_param(top_k),
         limit=top_k,
-        output_fields=["text"]
+        expr=document_filter(doc_ids),
+        output_fields=["text"],
+        consistency_level=READ_CONSISTENCY,
     )
     hits = results[0] if results else []
     return [hit.entity.get("text", "") for hit in hits]
@@ -103,24 +112,152 @@ def generate_answer(chunks, question):
 
                 Answer:"""
     
-    model = genai.GenerativeModel("models/gemini-2.0-flash-lite-001")
-    response = model.generate_content(prompt)
-    return response.text
+    return generate_text(get_model("models/gemini-2.0-flash-lite-001"), prompt, RAG_PROMPT_VERSION)
+
+
+def get_collection_config():
+    # Dimension is taken from the embedding model actually in use
+    global _collection_config
+    if _collection_config is None:
+        _collection_config = CollectionConfig.from_model(get_sentence_model(EMBEDDING_MODEL_NAME))
+    return _collection_config
+
+
+def get_collection():
+    global _collection, _manifest
+    if _collection is None:
+        with _collection_lock:
+            if _collection is None:
+                connect_milvus()
+                collection = create_milvus_collection(get_collection_config())
+                # Indexes are built and the collections loaded once, for the life of the process
+                ensure_indexes(collection, get_collection_config())
+                collection.load()
+                manifest = create_manifest_collection(get_collection_config())
+                manifest.load()
+                _manifest = manifest
+                _collection = collection
+    return _collection
+
+
+def get_manifest():
+    get_collection()
+    return _manifest
+
+
+def collection_loaded():
+    return _collection is not None
+
 
+def document_exists(doc_id):
+    if not re.fullmatch(r"[0-9a-f]{64}", doc_id or ""):
+        return False
+    if doc_id in _indexed_docs:
+        return True
+    if is_document_indexed(get_manifest(), doc_id):
+        _indexed_docs.add(doc_id)
+        return True
+    return False
 
-def handle_rag_pipeline(file, question):
-    path = os.path.join("temp", file.filename)
-    os.makedirs("temp", exist_ok=True)
-    file.save(path)
+
+@contextmanager
+def _ingest_lock(doc_id):
+    # Dropped from the map only when no thread holds or waits for it; popping it
+    # earlier would let a newcomer take a fresh lock while a waiter takes the old one
+    with _collection_lock:
+        entry = _ingest_locks.setdefault(doc_id, [threading.Lock(), 0])
+        entry[1] += 1
     try:
-        raw_text = extract_text_from_file(path)
-        clean_text = clean_extracted_text(raw_text)
-        chunks = chunk_text(clean_text)
-        vectors = get_qa_embeddings(chunks)
-        collection = create_milvus_collection()
-        insert_and_index_chunks(collection, vectors, chunks)
-        top_chunks = search_chunks(collection, question)
-        answer = generate_answer(top_chunks, question)
-        return answer
+        with entry[0]:
+            yield
     finally:
-        os.remove(path)
\ No newline at end of file
+        with _collection_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _ingest_locks[doc_id]
+
+
+def set_document_lock(factory):
+    """``factory(doc_id)`` returns a context manager held while ``doc_id`` is
+    ingested, excluding every other worker process (app.py uses a SQL Server
+    application lock). Without one, ingests are only serialised within a process."""
+    global _document_lock
+    _document_lock = factory
+
+
+def ingest_document(file, progress=None):
+    """Index ``file`` once; returns ``(doc_id, newly_ingested)``."""
+    doc_id = content_hash(file)
+    if document_exists(doc_id):
+        return doc_id, False
+
+    # Two concurrent uploads of the same file must not both ingest it, in this
+    # process (threads) or in another one
+    with _ingest_lock(doc_id):
+        if document_exists(doc_id):
+            return doc_id, False
+        with _document_lock(doc_id) if _document_lock is not None else nullcontext():
+            # Another process may have finished it while we waited for the lock
+            if document_exists(doc_id):
+                return doc_id, False
+            _ingest(file, doc_id, progress)
+    return doc_id, True
+
+
+def _ingest(file, doc_id, progress=None):
+    collection, manifest = get_collection(), get_manifest()
+    # No marker and nobody else ingesting it (we hold its lock): any rows are
+    # left from an ingest that died part-way
+    if has_document_rows(collection, doc_id):
+        print(f"⚠️  Removing chunks of an unfinished ingest of {doc_id}")
+        delete_document(collection, doc_id, manifest)
+
+    sentences = iter_cached_sentences(file, "rag", clean_extracted_text, doc_hash=doc_id)
+    # Chunks are embedded and inserted batch by batch while the document is still being read
+    inserted = _ingest_service.ingest(
+        collection, chunk_text(sentences), get_qa_embeddings, doc_id, progress, manifest
+    )
+    if not inserted:
+        raise ValueError("No text could be extracted from the document.")
+    _indexed_docs.add(doc_id)
+
+
+def answer_question(doc_ids, question, progress=None):
+    if isinstance(doc_ids, str):
+        doc_ids = [doc_ids]
+    for doc_id in doc_ids:
+        if not document_exists(doc_id):
+            raise KeyError(f"Unknown document id: {doc_id}")
+
+    scope = answer_cache.scope_of(doc_ids)
+    use_cache = RAG_ANSWER_CACHE and not cache_bypassed()
+    if use_cache:
+        cached = answer_cache.get_exact(scope, question)
+        if cached is not None:
+            return cached
+
+    # The query embedding is computed once: for the semantic lookup and for the search
+    vector = embed_query(question)
+    if use_cache:
+        cached = answer_cache.get_similar(scope, vector)
+        if cached is not None:
+            return cached
+
+    if progress is not None:
+        progress(message="searching")
+    top_chunks = search_chunks(get_collection(), question, doc_ids, vector=vector)
+    if progress is not None:
+        progress(message="generating answer")
+    answer = generate_answer(top_chunks, question)
+    if RAG_ANSWER_CACHE:
+        answer_cache.store(scope, question, vector, answer)
+    return answer
+
+
+def handle_rag_pipeline(file, question, progress=None):
+    doc_id, _ = ingest_document(file, progress)
+    return answer_question(doc_id, question, progress)
+
+
+def ingest_stats():
+    return _ingest_service.stats()
@@ -1,42 +1,25 @@
 # summarizer.py
 
 import os
-import fitz  # PyMuPDF
-import docx
-from dotenv import load_dotenv
-from nltk.tokenize import sent_tokenize
-import nltk
-import google.generativeai as genai
-
-load_dotenv()
-genai.configure(api_key=os.getenv("API_KEY"))
-model = genai.GenerativeModel("models/gemini-1.5-flash")
-nltk.download('punkt', quiet=True)
-
-def extract_text_from_pdf(file_path):
-    with fitz.open(file_path) as doc:
-        return "".join([page.get_text() for page in doc])
-
-def extract_text_from_docx(file_path):
-    doc = docx.Document(file_path)
-    return "\n".join(para.text for para in doc.paragraphs)
-
-def extract_text_from_txt(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        return f.read()
-
-def chunk_text(text, max_tokens=3000):
-    sentences = sent_tokenize(text)
-    chunks, chunk = [], ""
-    for sentence in sentences:
-        if len(chunk.split()) + len(sentence.split()) < max_tokens:
-            chunk += sentence + " "
-        else:
-            chunks.append(chunk.strip())
-            chunk = sentence + " "
-    if chunk:
-        chunks.append(chunk.strip())
-    return chunks
+import re
+from app_modules.llm_executor import map_llm, iter_llm
+from app_modules.llm_cache import generate_text, cache_bypassed
+from app_modules.gemini import get_model
+from app_modules.cache import LRUCache, DiskCache, TieredCache
+from app_modules.extraction import content_hash
+from app_modules.document_cache import iter_cached_sentences
+from app_modules.chunking import chunk_profile, chunk_texts, iter_chunks
+
+SUMMARY_PROMPT_VERSION = 1
+
+def clean_text(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+# ~3000 words per section summary, no overlap
+SUMMARY_CHUNKS = chunk_profile("abstractive", max_tokens=4000)
+
+def chunk_text(sentences, profile=SUMMARY_CHUNKS):
+    return chunk_texts(sentences, profile)
 
 def summarize_with_gemini(text):
     prompt = f"""You are an intelligent summarization assistant.
@@ -59,22 +42,120 @@ Then generate a summary based on the type:
 🧾 General/Other Content → Provide a brief, easy-to-understand summary of the main ideas.
 \n\n{text}
 Now, generate an appropriate abstractive summary based on the file type and content."""
-    response = model.generate_content(prompt)
-    return response.text.strip()
-
-def summarize_file(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext == ".pdf":
-        raw_text = extract_text_from_pdf(file_path)
-    elif ext == ".docx":
-        raw_text = extract_text_from_docx(file_path)
-    elif ext == ".txt":
-        raw_text = extract_text_from_txt(file_path)
-    else:
-        raise ValueError("Unsupported file type. Please use PDF, DOCX, or TXT.")
-
-    chunks = chunk_text(raw_text)
-    summaries = [summarize_with_gemini(chunk) for chunk in chunks]
-    final_summary = summarize_with_gemini(" ".join(summaries))
+    return generate_text(get_model(), prompt, SUMMARY_PROMPT_VERSION).strip()
+
+# ---------------- TREE REDUCE ----------------
+# Section summaries are grouped into batches that fit REDUCE_CHUNKS and each
+# batch is summarised again, level by level, until one summary is left. A
+# document that fits in one chunk needs a single call. Every node is cached
+# under the document hash, so a failed or retried job resumes from the nodes
+# it already has instead of starting over.
+
+# Input budget of one reduce call (joined child summaries)
+REDUCE_CHUNKS = chunk_profile("summary_reduce", max_tokens=6000)
+SUMMARY_NODE_TTL = float(os.getenv("SUMMARY_NODE_TTL", str(24 * 3600)))
+SUMMARY_NODE_DB = os.getenv("SUMMARY_NODE_DB")  # e.g. cache/summary_nodes.sqlite3; unset = memory only
+
+_nodes = TieredCache(
+    LRUCache(max_entries=int(os.getenv("SUMMARY_NODE_ENTRIES", "4096")), ttl=SUMMARY_NODE_TTL),
+    DiskCache(SUMMARY_NODE_DB, table="summary_nodes", ttl=SUMMARY_NODE_TTL) if SUMMARY_NODE_DB else None,
+)
+
+
+def _tree_id(doc_hash):
+    # Nodes are only reusable by a tree built with the same prompt and sizes
+    return f"{doc_hash}:{SUMMARY_PROMPT_VERSION}:{SUMMARY_CHUNKS.max_tokens}:{REDUCE_CHUNKS.max_tokens}"
+
+
+def _node_summary(node):
+    key, text = node
+    if not cache_bypassed():
+        cached = _nodes.get(key)
+        if cached is not None:
+            return cached
+    summary = summarize_with_gemini(text)
+    if summary:
+        _nodes.set(key, summary)
+    return summary
+
+
+def _group(summaries):
+    groups = [chunk.parts for chunk in iter_chunks(summaries, REDUCE_CHUNKS)]
+    if len(groups) >= len(summaries):
+        # Every summary fills a batch on its own: pair them so each level still shrinks
+        groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+    return groups
+
 
+def _iter_levels(summaries, tree, progress=None):
+    # Runs map_llm once per level from the calling thread; yields (level, summaries)
+    level = 0
+    while len(summaries) > 1:
+        level += 1
+        nodes = [(f"{tree}:{level}:{i}", "\n\n".join(group)) for i, group in enumerate(_group(summaries))]
+
+        def report(done, total, level=level):
+            if progress is not None:
+                progress(done, total, f"reduce level {level}: {done}/{total}")
+
+        summaries = map_llm(_node_summary, nodes, on_progress=report)
+        yield level, summaries
+
+
+def _summary_chunks(file_storage, doc_hash=None):
+    return chunk_text(iter_cached_sentences(file_storage, "whitespace", clean_text, doc_hash=doc_hash))
+
+
+def _leaves(file_storage, tree, doc_hash):
+    return ((f"{tree}:0:{i}", chunk) for i, chunk in enumerate(_summary_chunks(file_storage, doc_hash)))
+
+
+def _cached_root(tree):
+    return None if cache_bypassed() else _nodes.get(f"{tree}:root")
+
+
+def summarize_file(file_storage, progress=None):
+    doc_hash = content_hash(file_storage)
+    tree = _tree_id(doc_hash)
+    root = _cached_root(tree)
+    if root is not None:
+        return root
+
+    def report(done, total):
+        if progress is not None:
+            progress(done, total, f"chunk {done}/{total or '?'}")
+
+    summaries = map_llm(_node_summary, _leaves(file_storage, tree, doc_hash), on_progress=report)
+    for _, summaries in _iter_levels(summaries, tree, progress):
+        pass
+    final_summary = summaries[0] if summaries else ""
+    if final_summary:
+        _nodes.set(f"{tree}:root", final_summary)
     return final_summary
+
+def stream_summary(file_storage):
+    # Map step streamed: each section summary is yielded as soon as it is ready,
+    # then one event per reduce level, then the final summary.
+    doc_hash = content_hash(file_storage)
+    tree = _tree_id(doc_hash)
+    root = _cached_root(tree)
+    if root is not None:
+        yield {"event": "done", "total": None, "summary": root}
+        return
+
+    summaries = {}
+    for i, summary in iter_llm(_node_summary, _leaves(file_storage, tree, doc_hash)):
+        summaries[i] = summary
+        yield {"event": "chunk", "index": i, "summary": summary}
+    summaries = [summaries[i] for i in range(len(summaries))]
+    total = len(summaries)
+    for level, summaries in _iter_levels(summaries, tree):
+        yield {"event": "level", "level": level, "nodes": len(summaries)}
+    final_summary = summaries[0] if summaries else ""
+    if final_summary:
+        _nodes.set(f"{tree}:root", final_summary)
+    yield {"event": "done", "total": total, "summary": final_summary}
+
+
+def summary_node_stats():
+    return _nodes.stats()
@@ -2,56 +2,82 @@
 
 import os
 import re
-import fitz  # PyMuPDF
-import docx
-import nltk
 import numpy as np
-from nltk.tokenize import sent_tokenize
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-
-nltk.download('punkt')
-
-def extract_text(file_path):
-    ext = os.path.splitext(file_path)[-1].lower()
-    if ext == ".txt":
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
-    elif ext == ".pdf":
-        doc = fitz.open(file_path)
-        return "\n".join(page.get_text() for page in doc)
-    elif ext == ".docx":
-        doc = docx.Document(file_path)
-        return "\n".join([para.text for para in doc.paragraphs])
-    else:
-        raise ValueError("Unsupported file format")
+from app_modules.model_registry import get_sentence_model
+from app_modules.document_cache import iter_cached_sentences
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+CHUNK_SIZE = 30  # sentences per summary paragraph
+ENCODE_BATCH_SIZE = int(os.getenv("EXT_ENCODE_BATCH_SIZE", "256"))
+# "chunk": pick the top 20% of every 30-sentence chunk (original behaviour)
+# "document": pick the top 20% of the whole document, so chunk boundaries don't bias selection
+SUMMARY_SCOPE = os.getenv("EXT_SUMMARY_SCOPE", "chunk")
 
 def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def split_into_chunks(sentences, chunk_size=30):
-    return [sentences[i:i + chunk_size] for i in range(0, len(sentences), chunk_size)]
-
-def summarize_chunks(chunks, model):
-    summaries = []
-    for chunk in chunks:
-        embeddings = model.encode(chunk)
-        similarity_matrix = cosine_similarity(embeddings)
-        scores = similarity_matrix.sum(axis=1)
-        k = max(1, len(chunk) // 5)
-        top_k_idx = np.argsort(scores)[-k:]
-        top_k_idx.sort()
-        summaries.append(" ".join([chunk[i] for i in top_k_idx]))
-    return summaries
-
-def summarize_file(file_path):
-    text = extract_text(file_path)
-    cleaned = clean_text(text)
-    sentences = sent_tokenize(cleaned)
+def encode_sentences(sentences, model, batch_size=ENCODE_BATCH_SIZE):
+    # One batched call for the whole document instead of one per chunk
+    embeddings = model.encode(
+        sentences, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
+def centroid_scores(embeddings):
+    # For unit vectors, the row sums of the cosine matrix E·Eᵀ equal E·(Σ rows),
+    # so each score is one dot product with the sum: O(n·d), no n×n matrix.
+    return embeddings @ embeddings.sum(axis=0)
+
+def chunk_centroid_scores(embeddings, chunk_size=CHUNK_SIZE):
+    # Same formulation per chunk; full chunks are scored together as a (chunks, size, dim) block
+    n, dim = embeddings.shape
+    full = n - n % chunk_size
+    scores = np.empty(n, dtype=np.float32)
+    if full:
+        blocks = embeddings[:full].reshape(-1, chunk_size, dim)
+        sums = blocks.sum(axis=1)[:, :, None]
+        scores[:full] = np.matmul(blocks, sums).ravel()
+    if full < n:
+        scores[full:] = centroid_scores(embeddings[full:])
+    return scores
+
+def top_k_indices(scores, k):
+    if k >= len(scores):
+        return np.arange(len(scores))
+    idx = np.argpartition(scores, -k)[-k:]
+    idx.sort()
+    return idx
+
+def select_sentences(embeddings, scope=SUMMARY_SCOPE, chunk_size=CHUNK_SIZE):
+    n = len(embeddings)
+    if scope == "document":
+        return top_k_indices(centroid_scores(embeddings), max(1, n // 5))
+
+    scores = chunk_centroid_scores(embeddings, chunk_size)
+    full = n - n % chunk_size
+    selected = []
+    if full:
+        k = max(1, chunk_size // 5)
+        rows = scores[:full].reshape(-1, chunk_size)
+        idx = np.sort(np.argpartition(rows, -k, axis=1)[:, -k:], axis=1)
+        selected.append((idx + np.arange(0, full, chunk_size)[:, None]).ravel())
+    if full < n:
+        selected.append(full + top_k_indices(scores[full:], max(1, (n - full) // 5)))
+    return np.concatenate(selected)
+
+def summarize_sentences(sentences, embeddings, scope=SUMMARY_SCOPE, chunk_size=CHUNK_SIZE):
+    # Keep one output paragraph per chunk of the source, in document order
+    paragraphs = {}
+    for i in select_sentences(embeddings, scope, chunk_size):
+        paragraphs.setdefault(i // chunk_size, []).append(sentences[i])
+    return [" ".join(paragraphs[c]) for c in sorted(paragraphs)]
+
+def summarize_file(file_storage, scope=SUMMARY_SCOPE):
+    sentences = list(iter_cached_sentences(file_storage, "whitespace", clean_text))
     if not sentences:
         return "No content to summarize."
-    chunks = split_into_chunks(sentences)
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    summaries = summarize_chunks(chunks, model)
+    model = get_sentence_model(EMBEDDING_MODEL_NAME)
+    embeddings = encode_sentences(sentences, model)
+    summaries = summarize_sentences(sentences, embeddings, scope)
     return "\n".join(summaries)
@@ -0,0 +1,91 @@
+"""Timing of extractive-summary sentence scoring at 1k / 10k / 100k sentences.
+
+Usage (from flask_backend/):
+    python -m benchmarks.extractive_scoring_benchmark
+    python -m benchmarks.extractive_scoring_benchmark --encode   # also time model.encode batch sizes
+
+Compares the old per-chunk cosine-matrix scoring (argsort top-k) with the
+vectorised centroid scoring used by ext_summarisation, in both chunk and
+whole-document scope. Embeddings are random unit vectors, so only the scoring
+cost is measured unless --encode is given.
+"""
+import argparse
+import time
+import numpy as np
+
+from app_modules.summarisation.ext_summarisation import (
+    CHUNK_SIZE, select_sentences, encode_sentences, EMBEDDING_MODEL_NAME,
+)
+
+
+def old_chunk_scoring(embeddings, chunk_size=CHUNK_SIZE):
+    selected = []
+    for start in range(0, len(embeddings), chunk_size):
+        chunk = embeddings[start:start + chunk_size]
+        norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+        unit = chunk / norms
+        scores = (unit @ unit.T).sum(axis=1)
+        k = max(1, len(chunk) // 5)
+        idx = np.argsort(scores)[-k:]
+        idx.sort()
+        selected.append(start + idx)
+    return np.concatenate(selected)
+
+
+def old_document_scoring(embeddings):
+    scores = (embeddings @ embeddings.T).sum(axis=1)
+    idx = np.argsort(scores)[-max(1, len(embeddings) // 5):]
+    idx.sort()
+    return idx
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--encode", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'sentences':>10} {'old chunk':>12} {'new chunk':>12} {'old doc':>12} {'new doc':>12}  same-selection")
+    for n in (int(s) for s in args.sizes.split(",")):
+        emb = rng.standard_normal((n, args.dim)).astype(np.float32)
+        emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+
+        t_old, old_sel = timed(old_chunk_scoring, emb)
+        t_new, new_sel = timed(select_sentences, emb, "chunk")
+        t_new_doc, _ = timed(select_sentences, emb, "document")
+        # The n×n matrix is 40 GB at 100k sentences; only run it where it fits
+        if n <= 20000:
+            t_old_doc = f"{timed(old_document_scoring, emb, repeat=1)[0] * 1000:10.1f}ms"
+        else:
+            t_old_doc = "     (OOM)  "
+        same = np.array_equal(old_sel, new_sel)
+        print(f"{n:>10} {t_old * 1000:10.1f}ms {t_new * 1000:10.1f}ms {t_old_doc} {t_new_doc * 1000:10.1f}ms  {same}")
+
+    if args.encode:
+        from app_modules.model_registry import get_sentence_model
+        model = get_sentence_model(EMBEDDING_MODEL_NAME)
+        sentences = [f"This is benchmark sentence number {i} about topic {i % 17}." for i in range(2000)]
+        start = time.perf_counter()
+        for i in range(0, len(sentences), CHUNK_SIZE):
+            model.encode(sentences[i:i + CHUNK_SIZE])
+        print(f"encode per {CHUNK_SIZE}-sentence chunk: {time.perf_counter() - start:.2f}s for {len(sentences)} sentences")
+        for batch_size in (32, 128, 256, 512):
+            start = time.perf_counter()
+            encode_sentences(sentences, model, batch_size)
+            print(f"encode all, batch_size={batch_size}: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
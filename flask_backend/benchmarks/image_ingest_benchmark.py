@@ -0,0 +1,150 @@
+"""Latency and peak memory of OCR image ingest for 12 MP phone photos.
+
+Usage (from flask_backend/):
+    python -m benchmarks.image_ingest_benchmark
+    python -m benchmarks.image_ingest_benchmark --image photo.jpg --repeat 10
+
+Compares, up to the array EasyOCR works on:
+  - old doubt solving: PIL decode -> RGB -> JPEG re-encode -> EasyOCR decode + grey
+  - old captioning:    PIL decode -> RGB -> np.array copy
+  - new ingest:        one reduced-size OpenCV decode (app_modules.image_ingest)
+
+Each variant runs in a fresh process and reports the growth of peak RSS over
+the process baseline (VmHWM reset after warm-up on Linux), so decoder buffers
+allocated outside Python are counted.
+Without --image a synthetic 4032x3024 JPEG with EXIF orientation 6 is used.
+"""
+import argparse
+import io
+import multiprocessing
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def synthetic_photo(width=4032, height=3024):
+    rng = np.random.default_rng(0)
+    # Smooth gradient plus noise and some text, so the JPEG compresses like a photo
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = ((x + y) / 2).astype(np.uint8)
+    image = np.dstack([base, base[:, ::-1], np.flipud(base)])
+    image = cv2.add(image, rng.integers(0, 24, image.shape, dtype=np.uint8))
+    for row in range(10):
+        cv2.putText(image, f"Question {row + 1}: integrate x^2 dx from 0 to {row}",
+                    (150, 300 + row * 250), cv2.FONT_HERSHEY_SIMPLEX, 4, (0, 0, 0), 8)
+    pil = Image.fromarray(image)
+    exif = pil.getexif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    pil.save(buffer, format="JPEG", quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def old_doubt_solving(data):
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    img_bytes = io.BytesIO()
+    image.save(img_bytes, format="JPEG")
+    # What easyocr.utils.reformat_input does with bytes
+    img = cv2.imdecode(np.frombuffer(img_bytes.getvalue(), np.uint8), cv2.IMREAD_COLOR)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    grey = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return img, grey
+
+
+def old_captioning(data):
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    img = np.array(image)
+    grey = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    return img, grey
+
+
+def new_ingest(data):
+    from app_modules.image_ingest import decode_image
+    img = decode_image(data)
+    grey = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    return img, grey
+
+
+VARIANTS = {"old doubt solving": old_doubt_solving, "old captioning": old_captioning, "new ingest": new_ingest}
+
+
+def _reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets VmHWM, so imports don't mask the peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _measure(name, data, repeat, out):
+    fn = VARIANTS[name]
+    fn(data)  # first call pays for lazy imports and decoder initialisation
+    _reset_peak_rss()
+    baseline = _current_rss_mb()
+    times = []
+    shape = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img, _ = fn(data)
+        times.append(time.perf_counter() - start)
+        shape = img.shape
+        del img
+    out.put((min(times), sorted(times)[len(times) // 2], _peak_rss_mb() - baseline, shape))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="JPEG/PNG to use instead of the synthetic 12 MP photo")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            data = f.read()
+    else:
+        data = synthetic_photo()
+    print(f"input: {len(data) / 1e6:.1f} MB encoded")
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'variant':<20} {'best':>9} {'median':>9} {'peak RSS +':>11}  output shape")
+    for name in VARIANTS:
+        out = ctx.Queue()
+        proc = ctx.Process(target=_measure, args=(name, data, args.repeat, out))
+        proc.start()
+        best, median, peak, shape = out.get()
+        proc.join()
+        print(f"{name:<20} {best * 1000:7.1f}ms {median * 1000:7.1f}ms {peak:9.1f}MB  {shape}")
+
+
+if __name__ == "__main__":
+    main()
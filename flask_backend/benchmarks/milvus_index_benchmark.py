@@ -0,0 +1,178 @@
+"""Recall-vs-latency sweep for the RAG vector index settings.
+
+Usage (from flask_backend/):
+    python -m benchmarks.milvus_index_benchmark --backend numpy
+    python -m benchmarks.milvus_index_benchmark --backend milvus --host localhost --port 19530
+
+The numpy backend is an in-process IVF stand-in (k-means coarse quantiser +
+exact re-scoring inside the probed lists) so nlist/nprobe trade-offs can be
+explored without a server. The milvus backend builds every index type in
+CollectionConfig against a scratch collection. Ground truth is always an
+exact inner-product search over the same normalised vectors.
+"""
+import argparse
+import time
+import numpy as np
+
+
+# -------------------------------
+# 🔧 Data
+# -------------------------------
+def make_vectors(n, dim, clusters=64, seed=0):
+    # Clustered data behaves much more like sentence embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    vectors = centres[labels] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(base, queries, k):
+    scores = queries @ base.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+
+def recall(found, truth):
+    return float(np.mean([len(set(f) & t) / len(t) for f, t in zip(found, truth)]))
+
+
+def summarise(latencies):
+    ms = np.asarray(latencies) * 1000
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 95))
+
+
+def report(label, rec, latencies):
+    p50, p95 = summarise(latencies)
+    print(f"{label:<40} recall@k={rec:.3f}  p50={p50:7.2f}ms  p95={p95:7.2f}ms")
+
+
+# -------------------------------
+# ✅ In-process IVF stand-in
+# -------------------------------
+def kmeans(vectors, nlist, iters=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = vectors[assign == c]
+            if len(members):
+                centre = members.mean(axis=0)
+                centroids[c] = centre / (np.linalg.norm(centre) or 1.0)
+    assign = np.argmax(vectors @ centroids.T, axis=1)
+    lists = [np.flatnonzero(assign == c) for c in range(nlist)]
+    return centroids, lists
+
+
+def run_numpy(base, queries, truth, k, nlists, nprobes):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        scores = base @ q
+        np.argpartition(-scores, k)[:k]
+        latencies.append(time.perf_counter() - start)
+    report("FLAT (exact)", 1.0, latencies)
+
+    for nlist in nlists:
+        centroids, lists = kmeans(base, nlist)
+        for nprobe in nprobes:
+            if nprobe > nlist:
+                continue
+            found, latencies = [], []
+            for q in queries:
+                start = time.perf_counter()
+                probe = np.argpartition(-(centroids @ q), nprobe - 1)[:nprobe]
+                candidates = np.concatenate([lists[c] for c in probe])
+                if len(candidates) > k:
+                    best = candidates[np.argpartition(-(base[candidates] @ q), k)[:k]]
+                else:
+                    best = candidates
+                latencies.append(time.perf_counter() - start)
+                found.append(best)
+            report(f"IVF_FLAT nlist={nlist} nprobe={nprobe}", recall(found, truth), latencies)
+
+
+# -------------------------------
+# ✅ Milvus
+# -------------------------------
+def run_milvus(base, queries, truth, k, host, port):
+    from pymilvus import connections, utility, FieldSchema, CollectionSchema, DataType, Collection
+    import sys, os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from db_setup import CollectionConfig
+
+    connections.connect("default", host=host, port=port)
+    name = "rag_index_benchmark"
+    dim = base.shape[1]
+
+    sweeps = [
+        ("HNSW", {"M": 16, "efConstruction": 200}, [{"ef": ef} for ef in (16, 32, 64, 128, 256)]),
+        ("HNSW", {"M": 32, "efConstruction": 300}, [{"ef": ef} for ef in (32, 64, 128)]),
+        ("IVF_FLAT", {"nlist": 128}, [{"nprobe": p} for p in (4, 8, 16, 32)]),
+        ("IVF_PQ", {"nlist": 128, "m": 8, "nbits": 8}, [{"nprobe": p} for p in (8, 16, 32, 64)]),
+    ]
+
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    schema = CollectionSchema([
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=False),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=dim),
+    ])
+    collection = Collection(name, schema)
+    for start in range(0, len(base), 5000):
+        batch = base[start:start + 5000]
+        collection.insert([list(range(start, start + len(batch))), batch.tolist()])
+    collection.flush()
+
+    try:
+        for index_type, build, searches in sweeps:
+            config = CollectionConfig(dim=dim, name=name, index_type=index_type, build_params=build)
+            collection.release()
+            if collection.has_index():
+                collection.drop_index()
+            start = time.perf_counter()
+            collection.create_index("embedding", config.index_params())
+            utility.wait_for_index_building_complete(name)
+            build_seconds = time.perf_counter() - start
+            collection.load()
+            print(f"-- {index_type} {build} built in {build_seconds:.1f}s")
+
+            for search in searches:
+                config.search_params = search
+                found, latencies = [], []
+                for q in queries:
+                    t0 = time.perf_counter()
+                    res = collection.search([q.tolist()], "embedding", config.search_param(k), limit=k)
+                    latencies.append(time.perf_counter() - t0)
+                    found.append([hit.id for hit in res[0]])
+                report(f"{index_type} {search}", recall(found, truth), latencies)
+    finally:
+        utility.drop_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["numpy", "milvus"], default="numpy")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default="19530")
+    args = parser.parse_args()
+
+    data = make_vectors(args.vectors + args.queries, args.dim)
+    base, queries = data[:args.vectors], data[args.vectors:]
+    truth = exact_top_k(base, queries, args.k)
+    print(f"{args.vectors} vectors, {args.queries} queries, dim={args.dim}, k={args.k}")
+
+    if args.backend == "numpy":
+        run_numpy(base, queries, truth, args.k, nlists=(64, 128, 256), nprobes=(1, 4, 8, 16, 32))
+    else:
+        run_milvus(base, queries, truth, args.k, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""RAG ingest throughput (chunks/second) for a 500-page corpus.
+
+Usage (from flask_backend/):
+    python -m benchmarks.milvus_ingest_benchmark --backend milvus --host localhost --port 19530
+    python -m benchmarks.milvus_ingest_benchmark --backend milvus --embedder model
+    python -m benchmarks.milvus_ingest_benchmark --backend local
+
+Compares, per uploaded document:
+  - old ingest: embed every chunk, one insert, flush, index check, load
+  - new ingest: milvus_ingest.IngestService - batches embedded and inserted
+    while the next one is prepared, then one manifest row marking the
+    document complete; no flush/index/load per upload
+
+The milvus backend runs against a scratch collection. The local backend is an
+in-process stand-in whose insert/flush/load calls sleep for the given times,
+for checking the pipeline overlap without a server; its numbers are only as
+good as those times. --embedder random (default) uses random unit vectors so
+Milvus cost is measured on its own; --embedder model uses the RAG model.
+"""
+import argparse
+import hashlib
+import time
+
+import numpy as np
+
+from app_modules.chunking import chunk_profile, chunk_texts
+from milvus_ingest import IngestService, RAG_INGEST_BATCH
+
+SCRATCH_COLLECTION = "rag_ingest_benchmark"
+
+
+# -------------------------------
+# 🔧 Corpus
+# -------------------------------
+def make_pages(pages, words_per_page=450, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    for _ in range(pages):
+        words = []
+        while len(words) < words_per_page:
+            words.extend(rng.choice(vocabulary, rng.integers(8, 30)).tolist())
+            words[-1] += "."
+        yield " ".join(words)
+
+
+def make_chunks(pages, tokenizer):
+    sentences = (s + "." for page in make_pages(pages) for s in page.split(".") if s.strip())
+    return list(chunk_texts(sentences, chunk_profile("rag", max_tokens=384, overlap=64, tokenizer=tokenizer)))
+
+
+# -------------------------------
+# 🔧 Embedders
+# -------------------------------
+def random_embedder(dim):
+    rng = np.random.default_rng(1)
+
+    def embed(texts):
+        vectors = rng.standard_normal((len(texts), dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors.tolist()
+
+    return embed
+
+
+def model_embedder():
+    from app_modules.rag import get_qa_embeddings
+
+    return get_qa_embeddings
+
+
+# -------------------------------
+# 🔧 Backends
+# -------------------------------
+class LocalCollection:
+    """Stand-in for pymilvus.Collection: every call sleeps for its configured cost."""
+
+    name = "local"
+
+    def __init__(self, insert_ms, insert_ms_per_1k, flush_ms, load_ms):
+        self.insert_ms = insert_ms
+        self.insert_ms_per_1k = insert_ms_per_1k
+        self.flush_ms = flush_ms
+        self.load_ms = load_ms
+        self.rows = 0
+
+    def insert(self, data):
+        time.sleep((self.insert_ms + self.insert_ms_per_1k * len(data[0]) / 1000) / 1000)
+        self.rows += len(data[0])
+
+    def flush(self):
+        time.sleep(self.flush_ms / 1000)
+
+    def load(self):
+        time.sleep(self.load_ms / 1000)
+
+    def has_index(self, index_name=None):
+        return True
+
+    def delete(self, expr):
+        pass
+
+
+def milvus_collection(args, dim):
+    from pymilvus import utility
+    from db_setup import (
+        CollectionConfig, connect_milvus, create_milvus_collection, create_manifest_collection, ensure_indexes,
+    )
+    import db_setup
+
+    db_setup.MILVUS_HOST, db_setup.MILVUS_PORT = args.host, args.port
+    connect_milvus()
+    config = CollectionConfig(dim=dim, name=SCRATCH_COLLECTION)
+    for name in (config.name, config.manifest_name):
+        if utility.has_collection(name):
+            utility.drop_collection(name)
+    collection = create_milvus_collection(config)
+    ensure_indexes(collection, config)
+    collection.load()
+    manifest = create_manifest_collection(config)
+    manifest.load()
+    return collection, manifest
+
+
+# -------------------------------
+# 🔧 Ingest Paths
+# -------------------------------
+def old_ingest(collection, chunks, embed, doc_id):
+    # What db_setup.insert_and_index_chunks did on every upload
+    vectors = embed(chunks)
+    collection.insert([vectors, chunks, [doc_id] * len(chunks)])
+    collection.flush()
+    collection.has_index(index_name="embedding_idx")
+    collection.has_index(index_name="doc_id_idx")
+    collection.load()
+    return len(chunks)
+
+
+def new_ingest(service, collection, manifest, chunks, embed, doc_id):
+    return service.ingest(collection, iter(chunks), embed, doc_id, manifest=manifest)
+
+
+def run(label, ingest, docs):
+    total = 0
+    start = time.perf_counter()
+    for i in range(docs):
+        doc_id = hashlib.sha256(f"{label}-{i}".encode()).hexdigest()
+        total += ingest(doc_id)
+    seconds = time.perf_counter() - start
+    print(f"{label:<12} {total:>6} chunks in {seconds:7.2f}s  ->  {total / seconds:8.1f} chunks/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["milvus", "local"], default="milvus")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default="19530")
+    parser.add_argument("--embedder", choices=["random", "model"], default="random")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--docs", type=int, default=3, help="uploads per variant")
+    parser.add_argument("--batch", type=int, default=RAG_INGEST_BATCH)
+    parser.add_argument("--insert-ms", type=float, default=5.0, help="local backend: cost per insert call")
+    parser.add_argument("--insert-ms-per-1k", type=float, default=20.0, help="local backend: cost per 1000 rows")
+    parser.add_argument("--flush-ms", type=float, default=1500.0, help="local backend: cost per flush")
+    parser.add_argument("--load-ms", type=float, default=500.0, help="local backend: cost per load")
+    args = parser.parse_args()
+
+    if args.embedder == "model":
+        from app_modules.rag import EMBEDDING_MODEL_NAME, get_collection_config
+
+        embed, dim, tokenizer = model_embedder(), get_collection_config().dim, f"model:{EMBEDDING_MODEL_NAME}"
+    else:
+        embed, dim, tokenizer = random_embedder(384), 384, "estimate"
+
+    chunks = make_chunks(args.pages, tokenizer)
+    print(f"{args.pages} pages -> {len(chunks)} chunks, backend={args.backend}, "
+          f"embedder={args.embedder}, batch={args.batch}")
+
+    if args.backend == "local":
+        collection = LocalCollection(args.insert_ms, args.insert_ms_per_1k, args.flush_ms, args.load_ms)
+        manifest = LocalCollection(args.insert_ms, args.insert_ms_per_1k, args.flush_ms, args.load_ms)
+    else:
+        collection, manifest = milvus_collection(args, dim)
+
+    service = IngestService(batch_size=args.batch)
+    try:
+        run("old", lambda doc_id: old_ingest(collection, chunks, embed, doc_id), args.docs)
+        run("new", lambda doc_id: new_ingest(service, collection, manifest, chunks, embed, doc_id), args.docs)
+    finally:
+        service.shutdown()
+        if args.backend == "milvus":
+            from pymilvus import utility
+
+            utility.drop_collection(SCRATCH_COLLECTION)
+            utility.drop_collection(f"{SCRATCH_COLLECTION}_manifest")
+
+
+if __name__ == "__main__":
+    main()
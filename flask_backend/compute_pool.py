@@ -0,0 +1,270 @@
+import bisect
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+import cv2
+import numpy as np
+
+# ---------------- COMPUTE POOLS ----------------
+# CPU-heavy auth work runs on dedicated, bounded executors instead of Flask
+# request threads, so a burst of logins cannot starve every other endpoint:
+#   - face analysis (InsightFace) on a process pool, one model copy per worker
+#   - bcrypt on a thread pool (the bcrypt C code releases the GIL)
+# When an executor already has ``max_pending`` calls queued or running, new
+# calls are rejected at once with PoolSaturated (served as 503 + Retry-After).
+
+FACE_MODEL_NAME = os.getenv("FACE_MODEL_NAME", "buffalo_l")
+FACE_POOL_MODE = os.getenv("FACE_POOL_MODE", "process")  # "process" or "thread"
+FACE_WORKERS = int(os.getenv("FACE_WORKERS", "2"))
+FACE_MAX_PENDING = int(os.getenv("FACE_MAX_PENDING", str(FACE_WORKERS * 4)))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "4"))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", str(BCRYPT_WORKERS * 8)))
+COMPUTE_TIMEOUT = float(os.getenv("COMPUTE_TIMEOUT", "30"))
+
+
+class PoolSaturated(RuntimeError):
+    def __init__(self, pool, retry_after=1):
+        super().__init__(f"{pool} pool is saturated")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+# -------------------------------
+# 📊 Latency Histogram
+# -------------------------------
+class LatencyHistogram:
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)  # last bucket: above the largest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+            self.count += 1
+            self.total += ms
+            if ms > self.max:
+                self.max = ms
+
+    def _quantile(self, q):
+        # Upper bound of the bucket holding the q-th sample (caller holds the lock)
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.BOUNDS_MS[i] if i < len(self.BOUNDS_MS) else round(self.max, 3)
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            if not self.count:
+                return {"count": 0}
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total / self.count, 3),
+                "max_ms": round(self.max, 3),
+                "p50_ms": self._quantile(0.50),
+                "p95_ms": self._quantile(0.95),
+                "p99_ms": self._quantile(0.99),
+                "buckets_ms": {
+                    (f"<={b}" if i < len(self.BOUNDS_MS) else f">{self.BOUNDS_MS[-1]}"): n
+                    for i, (b, n) in enumerate(zip(self.BOUNDS_MS + (None,), self.counts))
+                    if n
+                },
+            }
+
+
+# -------------------------------
+# ✅ Bounded Executor
+# -------------------------------
+class BoundedPool:
+    def __init__(self, executor, max_pending, name):
+        self._executor = executor
+        self.max_pending = max_pending
+        self.name = name
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self.pending = 0
+        self.rejected = 0
+
+    def _histogram(self, op):
+        with self._lock:
+            histogram = self._histograms.get(op)
+            if histogram is None:
+                histogram = self._histograms[op] = LatencyHistogram()
+            return histogram
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def submit(self, op, fn, *args):
+        """Queue ``fn(*args)`` without waiting; latency (queue wait included) is recorded under ``op``."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(self.name)
+        with self._lock:
+            self.pending += 1
+        start = time.perf_counter()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        histogram = self._histogram(op)
+        # The slot is held until the work really finishes, even if the caller times out
+        future.add_done_callback(lambda f: histogram.record(time.perf_counter() - start))
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, op, fn, *args, timeout=COMPUTE_TIMEOUT):
+        """Run ``fn(*args)`` on the pool and wait for the result."""
+        return self.submit(op, fn, *args).result(timeout)
+
+    def stats(self):
+        with self._lock:
+            histograms = dict(self._histograms)
+            summary = {"pending": self.pending, "max_pending": self.max_pending, "rejected": self.rejected}
+        summary["latency"] = {op: h.snapshot() for op, h in histograms.items()}
+        return summary
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# -------------------------------
+# 🧠 Face Analysis (runs in the worker)
+# -------------------------------
+_face_app = None
+_face_app_lock = threading.Lock()
+
+
+def _get_face_app():
+    global _face_app
+    if _face_app is None:
+        with _face_app_lock:
+            if _face_app is None:
+                from insightface.app import FaceAnalysis
+
+                start = time.perf_counter()
+                face_app = FaceAnalysis(name=FACE_MODEL_NAME, providers=["CPUExecutionProvider"])
+                face_app.prepare(ctx_id=0)
+                _face_app = face_app
+                print(f"🔹 Loaded InsightFace '{FACE_MODEL_NAME}' in {time.perf_counter() - start:.2f}s (pid {os.getpid()})")
+    return _face_app
+
+
+def _face_embedding(image_bytes):
+    # Decoding happens in the worker too, so only the compressed bytes cross the process boundary
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Image decoding failed")
+    faces = _get_face_app().get(image)
+    if not faces:
+        return None
+    return np.asarray(faces[0].normed_embedding, dtype=np.float32)
+
+
+def _warm_up():
+    _get_face_app()
+    return os.getpid()
+
+
+# -------------------------------
+# ✅ Public API
+# -------------------------------
+_face_pool = None
+_bcrypt_pool = None
+_pools_lock = threading.Lock()
+
+
+def get_face_pool():
+    global _face_pool
+    if _face_pool is None:
+        with _pools_lock:
+            if _face_pool is None:
+                if FACE_POOL_MODE == "process":
+                    # fork: workers must not re-import the Flask app module the way spawn would
+                    executor = ProcessPoolExecutor(
+                        max_workers=FACE_WORKERS,
+                        mp_context=multiprocessing.get_context("fork"),
+                        initializer=_get_face_app,
+                    )
+                elif FACE_POOL_MODE == "thread":
+                    executor = ThreadPoolExecutor(max_workers=FACE_WORKERS, thread_name_prefix="face")
+                else:
+                    raise ValueError(f"Unknown FACE_POOL_MODE '{FACE_POOL_MODE}' (expected 'process' or 'thread')")
+                _face_pool = BoundedPool(executor, FACE_MAX_PENDING, "face")
+    return _face_pool
+
+
+def get_bcrypt_pool():
+    global _bcrypt_pool
+    if _bcrypt_pool is None:
+        with _pools_lock:
+            if _bcrypt_pool is None:
+                executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+                _bcrypt_pool = BoundedPool(executor, BCRYPT_MAX_PENDING, "bcrypt")
+    return _bcrypt_pool
+
+
+_face_warm_up = None
+
+
+def _forget_pools():
+    # In a forked child (e.g. a gunicorn worker of a --preload master) the
+    # inherited executors have no threads or worker processes of their own;
+    # drop them so the child creates its pools on first use
+    global _face_pool, _bcrypt_pool, _pools_lock, _face_warm_up
+    _face_pool = _bcrypt_pool = _face_warm_up = None
+    _pools_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_pools)
+
+
+def start_face_workers():
+    """Create the face pool and warm it up (the "face_workers" startup resource).
+    Returns at once; each worker loads the model in the background. The
+    returned future completes when one has."""
+    global _face_warm_up
+    if _face_warm_up is None:
+        _face_warm_up = get_face_pool().submit("warm_up", _warm_up)
+    return _face_warm_up
+
+
+def wait_for_face_workers(timeout=None):
+    return start_face_workers().result(timeout)
+
+
+def face_embedding(image_bytes):
+    """Normalised embedding of the first face in an encoded image, or None if no face is found."""
+    return get_face_pool().run("face_embedding", _face_embedding, image_bytes)
+
+
+def hash_password(password):
+    return get_bcrypt_pool().run("bcrypt_hash", bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt())
+
+
+def check_password(password, password_hash):
+    return get_bcrypt_pool().run("bcrypt_check", bcrypt.checkpw, password.encode("utf-8"), password_hash)
+
+
+def compute_stats():
+    return {
+        "face": _face_pool.stats() if _face_pool is not None else None,
+        "bcrypt": _bcrypt_pool.stats() if _bcrypt_pool is not None else None,
+    }
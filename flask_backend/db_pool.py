@@ -0,0 +1,226 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+# -------------------------------
+# 📊 Latency Metrics
+# -------------------------------
+class LatencyStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.total / self.count if self.count else 0.0
+            return {
+                "count": self.count,
+                "avg_ms": round(avg * 1000, 3),
+                "max_ms": round(self.max * 1000, 3),
+            }
+
+
+# -------------------------------
+# ✅ Pooled Connection + Timed Cursor
+# -------------------------------
+class TimedCursor:
+    """Cursor proxy that records execute/executemany latency into the pool stats."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def execute(self, sql, *params):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, *params)
+        finally:
+            self._stats.record(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_params):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_of_params)
+        finally:
+            self._stats.record(time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class PooledConnection:
+    def __init__(self, raw, pool):
+        self.raw = raw
+        self._pool = pool
+        self.last_used = time.monotonic()
+
+    def cursor(self):
+        return TimedCursor(self.raw.cursor(), self._pool.query_stats)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+
+# -------------------------------
+# ✅ Bounded Connection Pool
+# -------------------------------
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections created lazily from ``connect``.
+
+    Idle connections are pinged with ``health_check_sql`` before reuse once they
+    have been idle for ``health_check_interval`` seconds; a dead connection is
+    closed and replaced transparently.
+    """
+
+    def __init__(self, connect, max_size=10, acquire_timeout=10.0,
+                 health_check_interval=30.0, health_check_sql="SELECT 1"):
+        self._connect = connect
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_sql = health_check_sql
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self.reconnects = 0
+
+        self.wait_stats = LatencyStats()
+        self.query_stats = LatencyStats()
+
+    def _open(self):
+        return PooledConnection(self._connect(), self)
+
+    def _is_alive(self, conn):
+        try:
+            cursor = conn.raw.cursor()
+            cursor.execute(self.health_check_sql)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        start = time.perf_counter()
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.max_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.acquire_timeout)
+                except queue.Empty:
+                    raise PoolTimeout(
+                        f"No database connection available after {self.acquire_timeout}s"
+                    )
+        self.wait_stats.record(time.perf_counter() - start)
+
+        if time.monotonic() - conn.last_used > self.health_check_interval and not self._is_alive(conn):
+            conn.close()
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            self.reconnects += 1
+            print("Database connection dropped; reconnected.")
+
+        with self._lock:
+            self._in_use += 1
+        return conn
+
+    def release(self, conn, error=None):
+        with self._lock:
+            self._in_use -= 1
+
+        discard = False
+        if error is not None:
+            # Never hand a half-finished transaction to the next request
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+
+        conn.last_used = time.monotonic()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException as e:
+            self.release(conn, error=e)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        with self._lock:
+            created, in_use = self._created, self._in_use
+        return {
+            "max_size": self.max_size,
+            "open": created,
+            "in_use": in_use,
+            "idle": self._idle.qsize(),
+            "reconnects": self.reconnects,
+            "pool_wait": self.wait_stats.snapshot(),
+            "query_latency": self.query_stats.snapshot(),
+        }
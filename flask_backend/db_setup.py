@@ -1,53 +1,273 @@
-from pymilvus import FieldSchema, CollectionSchema, DataType, Collection, utility
+import os
+import json
+from dataclasses import dataclass, field
 
 # -------------------------------
 # 🔧 Configuration
 # -------------------------------
+MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
+MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
 COLLECTION_NAME = "rag_docs"
-EMBEDDING_DIM = 384  # use 384 for MiniLM; 768/1536 for other models
+EMBEDDING_DIM = 384  # fallback only; the real dimension comes from the loaded embedding model
+DOC_ID_MAX_LENGTH = 64  # sha256 hex digest of the uploaded file
+NUM_PARTITIONS = 64  # doc_id is the partition key, so a filtered search only touches one partition
+VECTOR_INDEX_NAME = "embedding_idx"
+DOC_ID_INDEX_NAME = "doc_id_idx"
+REQUIRED_FIELDS = {"id", "embedding", "text", "doc_id"}
+# Bytes; chunk text is ASCII after cleaning. A 384-token RAG chunk is usually
+# 1.5-2.5k characters; the headroom is for long tokens (URLs, numbers, codes)
+TEXT_MAX_LENGTH = 8192
+# The manifest holds one row per fully ingested document, written after its
+# last chunk batch. Milvus requires a vector field, so it has a tiny unused one
+MANIFEST_FIELDS = {"doc_id", "chunks", "marker"}
+MARKER_DIM = 2
+MARKER_INDEX_NAME = "marker_idx"
+# "Session": reads see this process's own inserts without a flush, since
+# inserted rows are searchable in growing segments
+READ_CONSISTENCY = os.getenv("MILVUS_READ_CONSISTENCY", "Session")
+# Another worker process may have just finished (or be redoing) the ingest
+MANIFEST_CONSISTENCY = "Strong"
+
+# Build / search defaults per index type, picked with benchmarks/milvus_index_benchmark.py
+DEFAULT_BUILD_PARAMS = {
+    "HNSW": {"M": 16, "efConstruction": 200},
+    "IVF_FLAT": {"nlist": 128},
+    "IVF_PQ": {"nlist": 128, "m": 8, "nbits": 8},
+    "FLAT": {},
+}
+DEFAULT_SEARCH_PARAMS = {
+    "HNSW": {"ef": 64},
+    "IVF_FLAT": {"nprobe": 16},
+    "IVF_PQ": {"nprobe": 32},
+    "FLAT": {},
+}
+
+
+@dataclass
+class CollectionConfig:
+    dim: int = EMBEDDING_DIM
+    name: str = COLLECTION_NAME
+    # Embeddings are L2-normalised, so inner product equals cosine similarity
+    metric_type: str = "IP"
+    index_type: str = "HNSW"
+    build_params: dict = field(default_factory=dict)
+    search_params: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.index_type = self.index_type.upper()
+        self.metric_type = self.metric_type.upper()
+        if self.index_type not in DEFAULT_BUILD_PARAMS:
+            raise ValueError(f"Unsupported index type: {self.index_type}")
+        self.build_params = {**DEFAULT_BUILD_PARAMS[self.index_type], **self.build_params}
+        self.search_params = {**DEFAULT_SEARCH_PARAMS[self.index_type], **self.search_params}
+        if self.index_type == "IVF_PQ" and self.dim % self.build_params["m"]:
+            raise ValueError(f"IVF_PQ m={self.build_params['m']} must divide dim={self.dim}")
+
+    @classmethod
+    def from_model(cls, model, **overrides):
+        """Derive the dimension from a SentenceTransformer; tuning comes from env or ``overrides``."""
+        settings = {
+            "dim": model.get_sentence_embedding_dimension(),
+            "metric_type": os.getenv("RAG_METRIC_TYPE", "IP"),
+            "index_type": os.getenv("RAG_INDEX_TYPE", "HNSW"),
+            "build_params": json.loads(os.getenv("RAG_INDEX_BUILD_PARAMS", "{}")),
+            "search_params": json.loads(os.getenv("RAG_INDEX_SEARCH_PARAMS", "{}")),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    @property
+    def manifest_name(self):
+        return f"{self.name}_manifest"
+
+    def index_params(self):
+        return {
+            "metric_type": self.metric_type,
+            "index_type": self.index_type,
+            "params": dict(self.build_params),
+        }
+
+    def search_param(self, top_k=None):
+        params = dict(self.search_params)
+        # HNSW can't return more results than its candidate list
+        if self.index_type == "HNSW" and top_k is not None:
+            params["ef"] = max(params.get("ef", top_k), top_k)
+        return {"metric_type": self.metric_type, "params": params}
 
 # -------------------------------
 # ✅ Create Milvus Collection
 # -------------------------------
-def create_milvus_collection():
-    if utility.has_collection(COLLECTION_NAME):
-        print(f"Collection '{COLLECTION_NAME}' already exists.")
-        return Collection(name=COLLECTION_NAME)
+def _field_param(collection, field_name, key):
+    for f in collection.schema.fields:
+        if f.name == field_name:
+            return f.params.get(key)
+    return None
+
+def _vector_dim(collection):
+    return _field_param(collection, "embedding", "dim")
+
+def _sync_vector_index(collection, config):
+    # Metric / index type / build params can change without touching the data
+    if not has_vector_index(collection):
+        return
+    current = collection.index(index_name=VECTOR_INDEX_NAME).params
+    wanted = config.index_params()
+    same = (
+        current.get("metric_type") == wanted["metric_type"]
+        and current.get("index_type") == wanted["index_type"]
+        and {k: str(v) for k, v in (current.get("params") or {}).items()}
+        == {k: str(v) for k, v in wanted["params"].items()}
+    )
+    if same:
+        return
+    print(f"Rebuilding '{config.name}' vector index: {current} -> {wanted}")
+    collection.release()
+    collection.drop_index(index_name=VECTOR_INDEX_NAME)
+    collection.create_index(field_name="embedding", index_params=wanted, index_name=VECTOR_INDEX_NAME)
+
+def connect_milvus(alias="default"):
+    # pymilvus is imported here, not at module import, so the app starts without it
+    from pymilvus import connections
+
+    if not connections.has_connection(alias):
+        connections.connect(alias, host=MILVUS_HOST, port=MILVUS_PORT)
+
+def create_milvus_collection(config=None):
+    from pymilvus import FieldSchema, CollectionSchema, DataType, Collection, utility
+
+    config = config or CollectionConfig()
+
+    if utility.has_collection(config.name):
+        collection = Collection(name=config.name)
+        existing = {f.name for f in collection.schema.fields}
+        dim = _vector_dim(collection)
+        text_length = int(_field_param(collection, "text", "max_length") or 0)
+        # Inserts are positional, so extra fields (e.g. the old per-chunk owner) are incompatible too
+        if existing == REQUIRED_FIELDS and dim == config.dim and text_length >= TEXT_MAX_LENGTH:
+            print(f"Collection '{config.name}' already exists.")
+            _sync_vector_index(collection, config)
+            return collection
+        # Chunks are derived data; rebuild rather than keep an unusable schema
+        print(f"Collection '{config.name}' has an incompatible schema "
+              f"(fields {sorted(existing)} vs {sorted(REQUIRED_FIELDS)}, dim {dim} vs {config.dim}, "
+              f"text length {text_length} vs {TEXT_MAX_LENGTH}); recreating it.")
+        utility.drop_collection(config.name)
+
+    # A manifest left from an earlier collection would mark chunks that no longer exist
+    if utility.has_collection(config.manifest_name):
+        utility.drop_collection(config.manifest_name)
 
     fields = [
         FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=EMBEDDING_DIM),
-        FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=2000),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=config.dim),
+        FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=TEXT_MAX_LENGTH),
+        FieldSchema(name="doc_id", dtype=DataType.VARCHAR, max_length=DOC_ID_MAX_LENGTH,
+                    is_partition_key=True),
     ]
     schema = CollectionSchema(fields, description="RAG Document Chunks")
-    collection = Collection(name=COLLECTION_NAME, schema=schema)
-    print(f"Collection '{COLLECTION_NAME}' created.")
+    collection = Collection(name=config.name, schema=schema, num_partitions=NUM_PARTITIONS)
+    print(f"Collection '{config.name}' created ({config.dim}-d, {config.index_type}/{config.metric_type}).")
+    return collection
+
+def create_manifest_collection(config=None):
+    """Create (if missing) and index the manifest of fully ingested documents."""
+    from pymilvus import FieldSchema, CollectionSchema, DataType, Collection, utility
+
+    config = config or CollectionConfig()
+    name = config.manifest_name
+
+    collection = Collection(name=name) if utility.has_collection(name) else None
+    if collection is not None and {f.name for f in collection.schema.fields} != MANIFEST_FIELDS:
+        print(f"Collection '{name}' has an incompatible schema; recreating it.")
+        utility.drop_collection(name)
+        collection = None
+
+    if collection is None:
+        fields = [
+            FieldSchema(name="doc_id", dtype=DataType.VARCHAR, max_length=DOC_ID_MAX_LENGTH,
+                        is_primary=True, auto_id=False),
+            FieldSchema(name="chunks", dtype=DataType.INT64),
+            FieldSchema(name="marker", dtype=DataType.FLOAT_VECTOR, dim=MARKER_DIM),
+        ]
+        schema = CollectionSchema(fields, description="RAG Documents Fully Ingested")
+        collection = Collection(name=name, schema=schema)
+        print(f"Collection '{name}' created.")
+
+    # Never searched, but a collection can only be loaded once its vector field is indexed
+    if not collection.has_index(index_name=MARKER_INDEX_NAME):
+        collection.create_index(field_name="marker", index_params={"index_type": "FLAT", "metric_type": "L2"},
+                                index_name=MARKER_INDEX_NAME)
     return collection
 
 # -------------------------------
-# ✅ Insert and Index Chunks
+# ✅ Bootstrap Indexes
+# -------------------------------
+def ensure_indexes(collection, config=None):
+    """Create the vector and doc_id indexes if missing. Done once at bootstrap,
+    before any data, so the collection can be loaded once and stay loaded."""
+    config = config or CollectionConfig()
+    if not has_vector_index(collection):
+        collection.create_index(
+            field_name="embedding",
+            index_params=config.index_params(),
+            index_name=VECTOR_INDEX_NAME,
+        )
+        print("Index created.")
+
+    if not collection.has_index(index_name=DOC_ID_INDEX_NAME):
+        collection.create_index(
+            field_name="doc_id",
+            index_params={"index_type": "INVERTED"},
+            index_name=DOC_ID_INDEX_NAME,
+        )
+
+# -------------------------------
+# ✅ Insert Chunks
 # -------------------------------
-def insert_and_index_chunks(collection, vectors, texts):
-    if not texts or not vectors:
+def insert_chunks(collection, vectors, texts, doc_id):
+    # No flush: Milvus seals and indexes segments in the background, and rows
+    # in growing segments are already searchable
+    if not texts or not len(vectors):
         raise ValueError("No data to insert.")
     if len(vectors) != len(texts):
         raise ValueError("Mismatch between number of vectors and texts.")
 
-    data_to_insert = [vectors, texts]
-    collection.insert(data_to_insert)
-    collection.flush()
-    print(f"Inserted {len(texts)} chunks into '{COLLECTION_NAME}'.")
+    # Never clipped here: the vectors were computed from the full text
+    too_long = [len(t.encode("utf-8")) for t in texts if len(t.encode("utf-8")) > TEXT_MAX_LENGTH]
+    if too_long:
+        raise ValueError(f"{len(too_long)} chunk(s) exceed the {TEXT_MAX_LENGTH}-byte text field "
+                         f"(longest {max(too_long)} bytes); split them before embedding.")
+    collection.insert([vectors, texts, [doc_id] * len(texts)])
 
-    if not collection.has_index():
-        collection.create_index(
-            field_name="embedding",
-            index_params={
-                "metric_type": "L2",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 128}
-            }
-        )
-        print("Index created.")
+def mark_document_indexed(manifest, doc_id, chunks):
+    # Written last: a document counts as indexed only once all its chunks are in
+    manifest.insert([[doc_id], [chunks], [[0.0] * MARKER_DIM]])
+
+def delete_document(collection, doc_id, manifest=None):
+    # Marker first, so no reader ever sees it without the chunks
+    if manifest is not None:
+        manifest.delete(expr=document_filter([doc_id]))
+    collection.delete(expr=document_filter([doc_id]))
+
+def has_vector_index(collection):
+    return collection.has_index(index_name=VECTOR_INDEX_NAME)
+
+# -------------------------------
+# ✅ Document Lookup & Scoping
+# -------------------------------
+def document_filter(doc_ids):
+    # json.dumps gives correctly quoted/escaped string literals for Milvus expressions.
+    # Who may read a doc_id is checked before searching (RagDocumentAccess in SQL)
+    return f"doc_id in {json.dumps(list(doc_ids))}"
+
+def has_document_rows(collection, doc_id):
+    # Strong: rows left by an ingest in another process must be seen
+    rows = collection.query(expr=document_filter([doc_id]), output_fields=["id"], limit=1,
+                            consistency_level=MANIFEST_CONSISTENCY)
+    return bool(rows)
 
-    collection.load()
-    print("Collection loaded into memory.")
\ No newline at end of file
+def is_document_indexed(manifest, doc_id):
+    # Chunk rows alone prove nothing: an ingest may still be running, or have died part-way
+    rows = manifest.query(expr=document_filter([doc_id]), output_fields=["chunks"], limit=1,
+                          consistency_level=MANIFEST_CONSISTENCY)
+    return bool(rows)
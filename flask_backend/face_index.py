@@ -0,0 +1,115 @@
+import threading
+import time
+import numpy as np
+
+# -------------------------------
+# 🔧 Configuration
+# -------------------------------
+FACE_MATCH_THRESHOLD = 0.60
+
+
+# -------------------------------
+# ✅ In-memory Face Embedding Index
+# -------------------------------
+class FaceIndex:
+    """Process-resident matrix of normalised face embeddings keyed by user id.
+
+    Writers rebuild the arrays under a lock and swap them in as one tuple, so
+    searches never block on registrations or deletions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = (np.empty(0, dtype=np.int64), None)
+        self._last_refresh = 0.0
+
+    def __len__(self):
+        return len(self._snapshot[0])
+
+    @staticmethod
+    def _normalise(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+    def build(self, rows):
+        # rows: iterable of (user_id, embedding_bytes) as stored in userAuthentication
+        ids, vectors = [], []
+        for user_id, embedding_bytes in rows:
+            if not embedding_bytes:
+                continue
+            ids.append(user_id)
+            vectors.append(np.frombuffer(embedding_bytes, dtype=np.float32))
+
+        if vectors:
+            matrix = self._normalise(np.stack(vectors))
+        else:
+            matrix = None
+
+        with self._lock:
+            self._snapshot = (np.asarray(ids, dtype=np.int64), matrix)
+        print(f"Face index built with {len(ids)} embeddings.")
+
+    def max_id(self):
+        ids = self._snapshot[0]
+        return int(ids.max()) if len(ids) else 0
+
+    def claim_refresh(self, min_interval):
+        """True for at most one caller per ``min_interval`` seconds."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_refresh < min_interval:
+                return False
+            self._last_refresh = now
+            return True
+
+    def merge(self, rows):
+        # rows registered elsewhere (e.g. by another worker); same shape as ``build``
+        rows = [(user_id, b) for user_id, b in rows if b]
+        if not rows:
+            return 0
+        new_ids = np.asarray([user_id for user_id, _ in rows], dtype=np.int64)
+        vectors = self._normalise(np.stack([np.frombuffer(b, dtype=np.float32) for _, b in rows]))
+        with self._lock:
+            ids, matrix = self._snapshot
+            keep = ~np.isin(ids, new_ids)
+            ids = np.concatenate([ids[keep], new_ids])
+            matrix = vectors if matrix is None else np.vstack([matrix[keep], vectors])
+            self._snapshot = (ids, np.ascontiguousarray(matrix))
+        return len(rows)
+
+    def add(self, user_id, embedding):
+        vector = self._normalise(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        with self._lock:
+            ids, matrix = self._snapshot
+            keep = ids != user_id
+            ids = np.append(ids[keep], np.int64(user_id))
+            matrix = vector if matrix is None else np.vstack([matrix[keep], vector])
+            self._snapshot = (ids, np.ascontiguousarray(matrix))
+
+    def remove(self, user_id):
+        with self._lock:
+            ids, matrix = self._snapshot
+            keep = ids != user_id
+            if keep.all():
+                return
+            ids = ids[keep]
+            matrix = np.ascontiguousarray(matrix[keep]) if len(ids) else None
+            self._snapshot = (ids, matrix)
+
+    def search(self, embedding, threshold=FACE_MATCH_THRESHOLD):
+        """Return ``(user_id, similarity)`` of the best match above ``threshold``, else None."""
+        ids, matrix = self._snapshot
+        if matrix is None:
+            return None
+
+        query = self._normalise(np.asarray(embedding, dtype=np.float32).ravel())
+        if query.shape[0] != matrix.shape[1]:
+            return None
+
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] <= threshold:
+            return None
+        return int(ids[best]), float(scores[best])
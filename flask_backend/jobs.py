@@ -0,0 +1,346 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------------
+# 🔧 Job States
+# -------------------------------
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+STALE_ERROR = "The worker running this job stopped"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# -------------------------------
+# ✅ Job Stores
+# -------------------------------
+class MemoryJobStore:
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.update(fields, updated=time.time())
+            return True
+
+    def touch(self, job_ids, now=None):
+        now = now or time.time()
+        with self._lock:
+            for job_id in job_ids:
+                if job_id in self._jobs:
+                    self._jobs[job_id]["heartbeat"] = now
+
+    def fail_stale(self, cutoff, job_id=None, **fields):
+        now = time.time()
+        failed = 0
+        with self._lock:
+            for key, job in self._jobs.items():
+                if job_id is not None and key != job_id:
+                    continue
+                if job["status"] not in FINISHED_STATES and job.get("heartbeat", now) < cutoff:
+                    job.update(fields, updated=now)
+                    failed += 1
+        return failed
+
+    def purge_expired(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            expired = [k for k, j in self._jobs.items() if j.get("expires") and j["expires"] < now]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore:
+    """Job table in SQLite so every worker process on the host sees the same jobs."""
+
+    COLUMNS = ("id", "kind", "owner", "status", "done", "total", "message",
+               "result", "error", "cancel_requested", "created", "updated", "expires", "heartbeat")
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    owner TEXT,
+                    status TEXT NOT NULL,
+                    done INTEGER,
+                    total INTEGER,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    expires REAL,
+                    heartbeat REAL
+                )
+            """)
+            # Tables created before jobs had a heartbeat
+            if "heartbeat" not in {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires ON jobs(expires)")
+            self._conn.commit()
+
+    @staticmethod
+    def _encode(fields):
+        fields = dict(fields)
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        if "cancel_requested" in fields:
+            fields["cancel_requested"] = int(bool(fields["cancel_requested"]))
+        return fields
+
+    def create(self, job):
+        job = self._encode(job)
+        cols = [c for c in self.COLUMNS if c in job]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                [job[c] for c in cols],
+            )
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def update(self, job_id, **fields):
+        fields = self._encode(fields)
+        fields["updated"] = time.time()
+        cols = list(fields)
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in cols)} WHERE id = ?",
+                [fields[c] for c in cols] + [job_id],
+            )
+            self._conn.commit()
+            return cur.rowcount > 0
+
+    def touch(self, job_ids, now=None):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ?", [(now or time.time(), job_id) for job_id in job_ids]
+            )
+            self._conn.commit()
+
+    def fail_stale(self, cutoff, job_id=None, **fields):
+        # One conditional UPDATE, so a job that finishes meanwhile is never overwritten
+        fields = self._encode(fields)
+        fields["updated"] = time.time()
+        cols = list(fields)
+        sql = (f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in cols)} "
+               f"WHERE status NOT IN ({', '.join('?' * len(FINISHED_STATES))}) "
+               f"AND COALESCE(heartbeat, updated) < ?")
+        params = [fields[c] for c in cols] + sorted(FINISHED_STATES) + [cutoff]
+        if job_id is not None:
+            sql += " AND id = ?"
+            params.append(job_id)
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cur.rowcount
+
+    def purge_expired(self, now=None):
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE expires IS NOT NULL AND expires < ?", (now or time.time(),)
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+
+# -------------------------------
+# ✅ Job Context & Manager
+# -------------------------------
+class JobContext:
+    """Handed to the task: report progress and notice cancellation."""
+
+    def __init__(self, manager, job_id):
+        self._manager = manager
+        self.job_id = job_id
+
+    def cancelled(self):
+        job = self._manager.store.get(self.job_id)
+        return job is None or job["cancel_requested"]
+
+    def progress(self, done=None, total=None, message=None):
+        # Cancellation is cooperative: it takes effect at the next progress report
+        if self.cancelled():
+            raise JobCancelled()
+        fields = {}
+        if done is not None:
+            fields["done"] = done
+        if total is not None:
+            fields["total"] = total
+        if message is not None:
+            fields["message"] = message
+        if fields:
+            self._manager.store.update(self.job_id, **fields)
+
+
+class JobManager:
+    """Runs jobs on a thread pool. While this process holds a queued or running
+    job it refreshes the job's heartbeat every ``heartbeat`` seconds; a job
+    whose heartbeat is older than ``stale_after`` belonged to a worker that was
+    killed, and is failed when read (and when a manager starts)."""
+
+    def __init__(self, store, workers=2, result_ttl=3600, heartbeat=10.0, stale_after=60.0):
+        self.store = store
+        self.result_ttl = result_ttl
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._beat_thread = None
+        self._stopped = threading.Event()
+        self._fail_stale()
+
+    def _fail_stale(self, job_id=None):
+        return self.store.fail_stale(
+            time.time() - self.stale_after, job_id=job_id,
+            status=FAILED, error=STALE_ERROR, message="failed", expires=time.time() + self.result_ttl,
+        )
+
+    def _beat(self):
+        while not self._stopped.wait(self.heartbeat):
+            with self._lock:
+                job_ids = list(self._futures)
+            if not job_ids:
+                continue
+            try:
+                self.store.touch(job_ids)
+            except Exception as e:
+                print(f"[jobs] Heartbeat failed: {e}")
+
+    def _start_heartbeat(self):
+        # Started with the first job, not at import (app workers may still be forked)
+        with self._lock:
+            if self._beat_thread is None:
+                self._beat_thread = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+                self._beat_thread.start()
+
+    def submit(self, kind, fn, *args, owner=None, **kwargs):
+        """Queue ``fn(ctx, *args, **kwargs)``; its return value must be JSON-serialisable."""
+        self.store.purge_expired()
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self.store.create({
+            "id": job_id, "kind": kind, "owner": owner, "status": QUEUED,
+            "done": 0, "total": None, "message": "queued",
+            "result": None, "error": None, "cancel_requested": False,
+            "created": now, "updated": now, "expires": None, "heartbeat": now,
+        })
+        self._start_heartbeat()
+        ctx = contextvars.copy_context()
+        future = self._executor.submit(ctx.run, self._run, job_id, fn, args, kwargs)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return job_id
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _finish(self, job_id, status, **fields):
+        self.store.update(job_id, status=status, expires=time.time() + self.result_ttl, **fields)
+
+    def _run(self, job_id, fn, args, kwargs):
+        ctx = JobContext(self, job_id)
+        if ctx.cancelled():
+            self._finish(job_id, CANCELLED, message="cancelled")
+            return
+        self.store.update(job_id, status=RUNNING, message="running")
+        try:
+            result = fn(ctx, *args, **kwargs)
+        except JobCancelled:
+            self._finish(job_id, CANCELLED, message="cancelled")
+        except Exception as e:
+            print(f"[jobs] Job {job_id} failed: {e}")
+            self._finish(job_id, FAILED, error=str(e), message="failed")
+        else:
+            self._finish(job_id, SUCCEEDED, result=result, message="done")
+
+    def get(self, job_id):
+        job = self.store.get(job_id)
+        if job and job["status"] not in FINISHED_STATES:
+            # Checked here cheaply; the store re-checks atomically before failing it
+            if (job.get("heartbeat") or job["updated"]) < time.time() - self.stale_after:
+                if self._fail_stale(job_id):
+                    job = self.store.get(job_id)
+        if job and job.get("expires") and job["expires"] < time.time():
+            return None
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return False
+        self.store.update(job_id, cancel_requested=True, message="cancelling")
+        with self._lock:
+            future = self._futures.get(job_id)
+        # Still queued in this process: drop it without ever starting
+        if future is not None and future.cancel():
+            self._finish(job_id, CANCELLED, message="cancelled")
+        return True
+
+    def shutdown(self, wait=False):
+        self._stopped.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def create_job_manager():
+    backend = os.getenv("JOB_STORE", "memory")
+    if backend == "sqlite":
+        store = SQLiteJobStore(os.getenv("JOB_DB", "cache/jobs.sqlite3"))
+    elif backend == "memory":
+        store = MemoryJobStore()
+    else:
+        raise ValueError(f"Unknown JOB_STORE '{backend}' (expected 'memory' or 'sqlite')")
+    return JobManager(
+        store,
+        workers=int(os.getenv("JOB_WORKERS", "2")),
+        result_ttl=float(os.getenv("JOB_RESULT_TTL", "3600")),
+        heartbeat=float(os.getenv("JOB_HEARTBEAT", "10")),
+        stale_after=float(os.getenv("JOB_STALE_AFTER", "60")),
+    )
@@ -0,0 +1,170 @@
+import atexit
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+# -------------------------------
+# ✅ Background Batched Log Writer
+# -------------------------------
+class LogSink:
+    """Bounded queue of rows drained by one worker thread with ``executemany``.
+
+    ``connection`` is a zero-argument callable returning a context manager that
+    yields a DB-API connection (e.g. ``ConnectionPool.connection`` or
+    ``lambda: sqlite3.connect(path)``). A batch is written in one transaction
+    once ``batch_size`` rows are queued or ``flush_interval`` seconds have
+    passed since the first row of the batch arrived.
+    """
+
+    def __init__(self, connection, insert_sql, max_queue=10000, batch_size=200,
+                 flush_interval=1.0, put_timeout=0.0, name="log-sink"):
+        self._connection = connection
+        self.insert_sql = insert_sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def submit(self, row):
+        """Queue one row; returns False and counts a drop when the queue stays full."""
+        try:
+            if self.put_timeout:
+                self._queue.put(row, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def stop(self, timeout=10.0):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        # Bounded on both steps: a dead or stuck worker must not hang interpreter
+        # shutdown. The event covers a queue too full to take the sentinel.
+        deadline = time.monotonic() + timeout
+        self._stopping.set()
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            print(f"[{self.name}] Worker did not stop within {timeout}s; unwritten rows are lost.")
+
+    def _write(self, rows):
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(self.insert_sql, rows)
+                conn.commit()
+        except Exception as e:
+            print(f"[{self.name}] Batch of {len(rows)} rows failed ({e}); retrying row by row.")
+            self._write_each(rows)
+            return
+        with self._lock:
+            self.written += len(rows)
+            self.batches += 1
+
+    def _write_each(self, rows):
+        # One bad row (e.g. a user deleted while its log was queued) must not sink the batch
+        written = 0
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                for row in rows:
+                    try:
+                        cursor.execute(self.insert_sql, row)
+                        conn.commit()
+                        written += 1
+                    except Exception:
+                        conn.rollback()
+        except Exception as e:
+            print(f"[{self.name}] Failed to write rows: {e}")
+        with self._lock:
+            self.written += written
+            self.failed += len(rows) - written
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+        # Drain whatever producers queued before shutdown
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
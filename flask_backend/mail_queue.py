@@ -0,0 +1,195 @@
+import atexit
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+_STOP = object()
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+# -------------------------------
+# ✅ Background Mail Queue
+# -------------------------------
+class MailQueue:
+    """Outbound mail handed to a small pool of worker threads.
+
+    ``connect`` is a zero-argument callable returning a context manager that
+    yields an object with ``send(message)`` (e.g. Flask-Mail's ``mail.connect``).
+    Each worker keeps its connection open between messages and closes it after
+    ``idle_timeout`` seconds without mail, or after a send error. ``context`` is
+    an optional callable returning a context manager to run each worker in
+    (``app.app_context`` for Flask-Mail, which needs ``current_app``).
+    """
+
+    def __init__(self, connect, workers=2, max_queue=1000, retries=3, backoff=2.0,
+                 idle_timeout=30.0, context=None, max_status=1000, name="mail"):
+        self._connect = connect
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self._context = context
+        self.max_status = max_status
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._status = OrderedDict()  # message id -> delivery record, most recent last
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.connections = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return self
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        atexit.register(self.stop)
+        return self
+
+    def submit(self, message, on_failure=None):
+        """Queue a message; returns its id, or None when the queue is full.
+
+        ``on_failure(error)`` runs on the worker once all retries are exhausted.
+        """
+        message_id = uuid.uuid4().hex
+        # Recorded first: once queued, a worker may already be marking it sending or sent
+        with self._lock:
+            self._record(message_id, status=QUEUED, attempts=0, error=None)
+        try:
+            self._queue.put_nowait((message_id, message, on_failure))
+        except queue.Full:
+            with self._lock:
+                self._status.pop(message_id, None)
+                self.dropped += 1
+            return None
+        with self._lock:
+            self.enqueued += 1
+        return message_id
+
+    def status(self, message_id):
+        with self._lock:
+            record = self._status.get(message_id)
+            return dict(record) if record else None
+
+    def stop(self, timeout=10.0):
+        with self._lock:
+            threads = self._threads
+            self._threads = []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+
+    def _record(self, message_id, **fields):
+        # Caller holds self._lock
+        record = self._status.get(message_id)
+        if record is None:
+            record = self._status[message_id] = {"id": message_id}
+            while len(self._status) > self.max_status:
+                self._status.popitem(last=False)
+        record.update(fields, updated=time.time())
+
+    # ---------- worker ----------
+    def _run(self):
+        if self._context is None:
+            self._work()
+        else:
+            with self._context():
+                self._work()
+
+    def _work(self):
+        session = None  # (context manager, connection) kept open between messages
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.idle_timeout if session else None)
+                except queue.Empty:
+                    session = self._close(session)
+                    continue
+                if item is _STOP:
+                    break
+                session = self._deliver(session, *item)
+        finally:
+            self._close(session)
+
+    def _open(self):
+        manager = self._connect()
+        connection = manager.__enter__()
+        with self._lock:
+            self.connections += 1
+        return manager, connection
+
+    def _close(self, session, error=None):
+        if session is not None:
+            manager, _ = session
+            try:
+                if error is None:
+                    manager.__exit__(None, None, None)
+                else:
+                    manager.__exit__(type(error), error, error.__traceback__)
+            except Exception:
+                pass
+        return None
+
+    def _deliver(self, session, message_id, message, on_failure):
+        attempt = 0
+        while True:
+            attempt += 1
+            with self._lock:
+                self._record(message_id, status=SENDING, attempts=attempt)
+            try:
+                if session is None:
+                    session = self._open()
+                session[1].send(message)
+            except Exception as e:
+                # The SMTP session may be half-closed; never reuse it after an error
+                session = self._close(session, e)
+                if attempt > self.retries:
+                    print(f"[{self.name}] Giving up on message {message_id} after {attempt} attempts: {e}")
+                    with self._lock:
+                        self.failed += 1
+                        self._record(message_id, status=FAILED, error=str(e))
+                    if on_failure is not None:
+                        try:
+                            on_failure(e)
+                        except Exception as callback_error:
+                            print(f"[{self.name}] on_failure callback failed: {callback_error}")
+                    return session
+                with self._lock:
+                    self.retried += 1
+                    self._record(message_id, status=QUEUED, error=str(e))
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+                continue
+
+            with self._lock:
+                self.sent += 1
+                self._record(message_id, status=SENT, error=None)
+            return session
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "connections_opened": self.connections,
+            }
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from db_setup import insert_chunks, delete_document, mark_document_indexed
+
+# ---------------- MILVUS INGEST ----------------
+# Chunks are embedded and inserted in fixed-size batches while the document is
+# still being chunked: the caller's thread embeds batch N+1 while batch N is
+# being inserted on a shared insert pool. Nothing is flushed, indexed or
+# loaded per upload - the indexes are built and the collection loaded once at
+# bootstrap (see rag.get_collection), and new rows are searchable from their
+# growing segments. Once the last batch is in, a row in the manifest collection
+# marks the document complete; until then readers treat it as unknown. A
+# failed ingest deletes whatever it already inserted. Rows left by an ingest
+# that died are cleared by the caller, under a lock every worker process
+# shares (see rag.ingest_document) - never here, where another process may be
+# ingesting the same document.
+
+RAG_INGEST_BATCH = int(os.getenv("RAG_INGEST_BATCH", "128"))
+RAG_INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", "2"))
+RAG_INGEST_IN_FLIGHT = int(os.getenv("RAG_INGEST_IN_FLIGHT", "2"))  # per upload
+
+
+def batched(items, size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+class IngestService:
+    def __init__(self, batch_size=RAG_INGEST_BATCH, workers=RAG_INGEST_WORKERS,
+                 max_in_flight=RAG_INGEST_IN_FLIGHT, name="milvus-ingest"):
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.failed = 0
+        self.chunks = 0
+        self.batches = 0
+        self.embed_seconds = 0.0
+        self.insert_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def _insert(self, collection, vectors, texts, doc_id):
+        start = time.perf_counter()
+        insert_chunks(collection, vectors, texts, doc_id)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.batches += 1
+            self.insert_seconds += seconds
+        return len(texts)
+
+    def ingest(self, collection, chunks, embed, doc_id, progress=None, manifest=None):
+        """Embed (``embed(texts) -> vectors``) and insert ``chunks``, then mark
+        ``doc_id`` complete in ``manifest``; returns the number inserted."""
+        start = time.perf_counter()
+        in_flight = deque()
+        submitted = 0
+        inserted = 0
+        try:
+            for batch in batched(chunks, self.batch_size):
+                began = time.perf_counter()
+                vectors = embed(batch)
+                with self._lock:
+                    self.embed_seconds += time.perf_counter() - began
+                while len(in_flight) >= self.max_in_flight:
+                    inserted += in_flight.popleft().result()
+                in_flight.append(self._executor.submit(self._insert, collection, vectors, batch, doc_id))
+                submitted += len(batch)
+                if progress is not None:
+                    progress(message=f"embedded {submitted} chunks")
+            while in_flight:
+                inserted += in_flight.popleft().result()
+            if manifest is not None and inserted:
+                mark_document_indexed(manifest, doc_id, inserted)
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            for future in in_flight:
+                if not future.cancelled():
+                    future.exception()
+            with self._lock:
+                self.failed += 1
+            if submitted:
+                try:
+                    delete_document(collection, doc_id, manifest)
+                except Exception as e:
+                    print(f"⚠️  Could not remove partial ingest of {doc_id}: {e}")
+            raise
+
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.documents += 1
+            self.chunks += inserted
+            self.wall_seconds += seconds
+        if inserted:
+            print(f"Inserted {inserted} chunks in {seconds:.2f}s ({inserted / seconds:.0f} chunks/s).")
+        return inserted
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "failed": self.failed,
+                "chunks": self.chunks,
+                "batches": self.batches,
+                "batch_size": self.batch_size,
+                "embed_seconds": round(self.embed_seconds, 3),
+                "insert_seconds": round(self.insert_seconds, 3),
+                "chunks_per_second": round(self.chunks / self.wall_seconds, 1) if self.wall_seconds else None,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,207 @@
+import heapq
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+# -------------------------------
+# 🔧 Verification Results
+# -------------------------------
+OTP_OK = "ok"
+OTP_MISSING = "missing"
+OTP_EXPIRED = "expired"
+OTP_INVALID = "invalid"
+OTP_LOCKED = "locked"  # too many wrong guesses; the code is discarded
+
+
+def generate_otp(digits=6):
+    return str(secrets.randbelow(10 ** digits)).zfill(digits)
+
+
+# -------------------------------
+# ✅ In-process Store
+# -------------------------------
+class MemoryOTPStore:
+    """One worker process only. Expired codes are swept from a min-heap on expiry time."""
+
+    def __init__(self, ttl=300, max_entries=10000, max_attempts=5):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_attempts = max_attempts
+        self._entries = {}  # email -> {"otp", "expires", "attempts"}
+        self._heap = []     # (expires, email); stale when the entry was replaced or removed
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires, email = heapq.heappop(heap)
+            entry = self._entries.get(email)
+            if entry is not None and entry["expires"] == expires:
+                del self._entries[email]
+        # Replaced codes leave stale heap entries behind; rebuild once they dominate
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._heap = [(e["expires"], email) for email, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _evict_oldest(self):
+        while self._heap:
+            expires, email = heapq.heappop(self._heap)
+            entry = self._entries.get(email)
+            if entry is not None and entry["expires"] == expires:
+                del self._entries[email]
+                return
+
+    def issue(self, email):
+        otp = generate_otp()
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            self._entries.pop(email, None)
+            while len(self._entries) >= self.max_entries:
+                self._evict_oldest()
+            expires = now + self.ttl
+            self._entries[email] = {"otp": otp, "expires": expires, "attempts": 0}
+            heapq.heappush(self._heap, (expires, email))
+        return otp
+
+    def verify(self, email, otp):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                self._sweep(now)
+                return OTP_MISSING
+            if entry["expires"] <= now:
+                del self._entries[email]
+                self._sweep(now)
+                return OTP_EXPIRED
+            if secrets.compare_digest(str(otp), entry["otp"]):
+                del self._entries[email]
+                return OTP_OK
+            entry["attempts"] += 1
+            if entry["attempts"] >= self.max_attempts:
+                del self._entries[email]
+                return OTP_LOCKED
+            return OTP_INVALID
+
+    def discard(self, email, otp=None):
+        # With ``otp``, only that code is dropped (a newer one for the same email survives)
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and (otp is None or entry["otp"] == otp):
+                del self._entries[email]
+
+    def stats(self):
+        with self._lock:
+            self._sweep(time.time())
+            return {"backend": "memory", "pending": len(self._entries), "max_entries": self.max_entries}
+
+
+# -------------------------------
+# ✅ SQLite Store (shared by workers)
+# -------------------------------
+class SQLiteOTPStore:
+    """OTP table in SQLite so every gunicorn worker on the host verifies against the same codes."""
+
+    def __init__(self, path, ttl=300, max_entries=10000, max_attempts=5):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode: every read-modify-write below runs in an explicit BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS otps (
+                    email TEXT PRIMARY KEY,
+                    otp TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS otps_expires ON otps(expires)")
+
+    def _transaction(self, fn):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(cur)
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
+            return result
+
+    def issue(self, email):
+        otp = generate_otp()
+        now = time.time()
+
+        def run(cur):
+            cur.execute("DELETE FROM otps WHERE expires <= ? OR email = ?", (now, email))
+            count = cur.execute("SELECT COUNT(*) FROM otps").fetchone()[0]
+            if count >= self.max_entries:
+                cur.execute(
+                    "DELETE FROM otps WHERE email IN (SELECT email FROM otps ORDER BY expires LIMIT ?)",
+                    (count - self.max_entries + 1,),
+                )
+            cur.execute(
+                "INSERT INTO otps (email, otp, expires, attempts) VALUES (?, ?, ?, 0)",
+                (email, otp, now + self.ttl),
+            )
+
+        self._transaction(run)
+        return otp
+
+    def verify(self, email, otp):
+        now = time.time()
+
+        def run(cur):
+            row = cur.execute("SELECT otp, expires, attempts FROM otps WHERE email = ?", (email,)).fetchone()
+            if row is None:
+                return OTP_MISSING
+            stored, expires, attempts = row
+            if expires <= now:
+                cur.execute("DELETE FROM otps WHERE expires <= ?", (now,))
+                return OTP_EXPIRED
+            if secrets.compare_digest(str(otp), stored):
+                cur.execute("DELETE FROM otps WHERE email = ?", (email,))
+                return OTP_OK
+            if attempts + 1 >= self.max_attempts:
+                cur.execute("DELETE FROM otps WHERE email = ?", (email,))
+                return OTP_LOCKED
+            cur.execute("UPDATE otps SET attempts = attempts + 1 WHERE email = ?", (email,))
+            return OTP_INVALID
+
+        return self._transaction(run)
+
+    def discard(self, email, otp=None):
+        if otp is None:
+            self._transaction(lambda cur: cur.execute("DELETE FROM otps WHERE email = ?", (email,)))
+        else:
+            self._transaction(lambda cur: cur.execute("DELETE FROM otps WHERE email = ? AND otp = ?", (email, otp)))
+
+    def stats(self):
+        def run(cur):
+            cur.execute("DELETE FROM otps WHERE expires <= ?", (time.time(),))
+            return cur.execute("SELECT COUNT(*) FROM otps").fetchone()[0]
+
+        return {"backend": "sqlite", "pending": self._transaction(run), "max_entries": self.max_entries}
+
+
+def create_otp_store():
+    backend = os.getenv("OTP_STORE", "memory")
+    options = {
+        "ttl": float(os.getenv("OTP_TTL", "300")),
+        "max_entries": int(os.getenv("OTP_MAX_ENTRIES", "10000")),
+        "max_attempts": int(os.getenv("OTP_MAX_ATTEMPTS", "5")),
+    }
+    if backend == "sqlite":
+        return SQLiteOTPStore(os.getenv("OTP_DB", "cache/otp.sqlite3"), **options)
+    if backend == "memory":
+        return MemoryOTPStore(**options)
+    raise ValueError(f"Unknown OTP_STORE '{backend}' (expected 'memory' or 'sqlite')")
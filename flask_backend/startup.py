@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+# ---------------- STARTUP RESOURCES ----------------
+# Heavy resources (database schema, face index, models, Milvus) are registered
+# here instead of being created at import. Each one is loaded once, either by
+# the first request that needs it (``ensure``) or by the background warm-up,
+# and its load time is logged. /readyz reports from ``resource_status``.
+# Worker pools are ``per_process``: a forked child (a gunicorn worker of a
+# --preload master) does not inherit them and loads them again.
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+_resources = {}
+_registry_lock = threading.Lock()
+_started = time.time()
+
+
+def register(name, loader, required=False, is_loaded=None, per_process=False):
+    """``required`` resources gate readiness; ``is_loaded`` reports a resource that
+    was created on first use elsewhere (e.g. the OCR reader) without going through ``ensure``."""
+    with _registry_lock:
+        _resources[name] = {
+            "loader": loader,
+            "required": required,
+            "is_loaded": is_loaded,
+            "per_process": per_process,
+            "lock": threading.Lock(),
+            "state": PENDING,
+            "seconds": None,
+            "error": None,
+        }
+
+
+def ensure(name):
+    resource = _resources[name]
+    if resource["state"] == READY:
+        return
+    with resource["lock"]:
+        if resource["state"] == READY:
+            return
+        resource["state"] = LOADING
+        start = time.perf_counter()
+        try:
+            resource["loader"]()
+        except Exception as e:
+            resource.update(state=FAILED, error=str(e), seconds=round(time.perf_counter() - start, 3))
+            print(f"❌ Startup: '{name}' failed after {resource['seconds']}s: {e}")
+            raise
+        resource.update(state=READY, error=None, seconds=round(time.perf_counter() - start, 3))
+        print(f"⏱️  Startup: '{name}' ready in {resource['seconds']}s")
+
+
+def warm_up(names, background=True):
+    """Load ``names`` in order; failures are logged and left for the next ``ensure`` to retry."""
+    def run():
+        for name in names:
+            try:
+                ensure(name)
+            except Exception:
+                pass
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _after_fork():
+    global _registry_lock
+    _registry_lock = threading.Lock()
+    for resource in _resources.values():
+        # The thread that held it (e.g. the warm-up) does not exist in the child
+        resource["lock"] = threading.Lock()
+        if resource["per_process"] or resource["state"] == LOADING:
+            resource.update(state=PENDING, seconds=None, error=None)
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _state(resource):
+    if resource["state"] != READY and resource["is_loaded"] is not None:
+        try:
+            if resource["is_loaded"]():
+                return READY
+        except Exception:
+            pass
+    return resource["state"]
+
+
+def resource_status():
+    return {
+        name: {
+            "state": _state(resource),
+            "required": resource["required"],
+            "seconds": resource["seconds"],
+            "error": resource["error"],
+        }
+        for name, resource in list(_resources.items())
+    }
+
+
+def is_ready():
+    return all(_state(r) == READY for r in list(_resources.values()) if r["required"])
+
+
+def uptime():
+    return time.time() - _started
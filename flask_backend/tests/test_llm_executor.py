@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app_modules import llm_executor
+from app_modules.llm_executor import LLMDeadlineExceeded, call_with_retry, iter_llm, map_llm
+
+_sleep = time.sleep  # the fake model's own delay, unaffected when a test patches the backoff sleep
+
+
+class FakeModel:
+    """Stands in for a Gemini call: sleeps ``delay(item)`` seconds and echoes the item."""
+
+    def __init__(self, delay=lambda item: 0.01, failures=None):
+        self.delay = delay
+        self.failures = dict(failures or {})  # item -> times to fail before succeeding
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, item):
+        with self._lock:
+            self.calls.append(item)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            _sleep(self.delay(item))
+            with self._lock:
+                if self.failures.get(item, 0) > 0:
+                    self.failures[item] -= 1
+                    raise RuntimeError(f"transient failure on {item}")
+            return f"summary of {item}"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch):
+    # A private pool per test, so the concurrency bound is known and no work leaks between tests
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="llm-test")
+    monkeypatch.setattr(llm_executor, "_executor", executor)
+    yield executor
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def test_map_llm_returns_results_in_input_order():
+    # Later items finish first
+    model = FakeModel(delay=lambda item: 0.05 - item * 0.005)
+    assert map_llm(model, range(8), retries=0) == [f"summary of {i}" for i in range(8)]
+
+
+def test_iter_llm_yields_in_completion_order():
+    model = FakeModel(delay=lambda item: {0: 0.2, 1: 0.0}[item])
+    assert [i for i, _ in iter_llm(model, [0, 1], retries=0)] == [1, 0]
+
+
+def test_concurrency_is_bounded_by_the_pool():
+    model = FakeModel(delay=lambda item: 0.03)
+    map_llm(model, range(12), retries=0)
+    assert model.max_active == 3
+    assert sorted(model.calls) == list(range(12))
+
+
+def test_items_are_submitted_while_the_input_is_still_produced():
+    model = FakeModel(delay=lambda item: 0.0)
+    started = []
+
+    def produce():
+        for i in range(3):
+            yield i
+            time.sleep(0.05)
+            started.append(len(model.calls))
+
+    map_llm(model, produce(), retries=0)
+    assert started[0] >= 1
+
+
+def test_transient_failures_are_retried():
+    model = FakeModel(failures={2: 2})
+    assert map_llm(model, range(4), retries=2, backoff=0.001)[2] == "summary of 2"
+    assert model.calls.count(2) == 3
+
+
+def test_failure_after_all_retries_is_raised():
+    model = FakeModel(failures={1: 5})
+    with pytest.raises(RuntimeError, match="transient failure on 1"):
+        map_llm(model, range(3), retries=1, backoff=0.001)
+    assert model.calls.count(1) == 2
+
+
+def test_on_error_supplies_a_placeholder():
+    model = FakeModel(failures={1: 5})
+    errors = []
+
+    def on_error(index, item, exc):
+        errors.append((index, item))
+        return "[unavailable]"
+
+    results = map_llm(model, ["a", 1, "c"], retries=0, on_error=on_error)
+    assert results == ["summary of a", "[unavailable]", "summary of c"]
+    assert errors == [(1, 1)]
+
+
+def test_backoff_is_exponential(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm_executor.random, "random", lambda: 0.5)  # jitter factor 1.0
+    monkeypatch.setattr(llm_executor.time, "sleep", sleeps.append)
+    model = FakeModel(delay=lambda item: 0, failures={"x": 3})
+
+    assert call_with_retry(model, "x", retries=3, backoff=0.1) == "summary of x"
+    assert sleeps == pytest.approx([0.1, 0.2, 0.4])
+
+
+def test_backoff_never_sleeps_past_the_deadline(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm_executor.time, "sleep", sleeps.append)
+    model = FakeModel(delay=lambda item: 0, failures={"x": 1})
+
+    with pytest.raises(RuntimeError):
+        call_with_retry(model, "x", retries=3, backoff=10, deadline=time.monotonic() + 1)
+    assert sleeps == []
+
+
+def test_deadline_exceeded_raises_and_cancels_the_rest():
+    model = FakeModel(delay=lambda item: 0.3)
+    start = time.monotonic()
+    with pytest.raises(LLMDeadlineExceeded):
+        map_llm(model, range(9), retries=0, timeout=0.1)
+    assert time.monotonic() - start < 0.3
+    # Only the calls already running when the deadline hit were started
+    time.sleep(0.35)
+    assert len(model.calls) == 3
+
+
+def test_progress_reports_the_total_once_known():
+    model = FakeModel(delay=lambda item: 0.01)
+    progress = []
+    map_llm(model, range(3), retries=0, on_progress=lambda done, total: progress.append((done, total)))
+    assert progress[-1] == (3, 3)
+    assert [done for done, _ in progress] == [1, 2, 3]
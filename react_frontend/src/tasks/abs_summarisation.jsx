@@ -2,7 +2,7 @@ import React, { useState } from "react";
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
 import { UploadCloud, Loader2, XCircle, FileText } from "lucide-react";
-import axios from "axios";
+import { streamNdjson } from "../utils/streamNdjson";
 import { motion } from "framer-motion";
 import { jsPDF } from "jspdf";
 
@@ -10,6 +10,7 @@ const AbsSummarizationDashboard = () => {
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
   const [response, setResponse] = useState("");
+  const [partial, setPartial] = useState([]);
 
   const handleFileChange = (e) => {
     setFile(e.target.files[0]);
@@ -20,19 +21,26 @@ const AbsSummarizationDashboard = () => {
     if (!file) return alert("Please select a file first.");
 
     setLoading(true);
+    setResponse("");
+    setPartial([]);
     const formData = new FormData();
     formData.append("file", file);
 
+    // Section summaries arrive one by one; the combined summary replaces them at the end
     try {
-      const res = await axios.post("http://localhost:5000/abstractive", formData, {
-        headers: { "Content-Type": "multipart/form-data" },
+      const final = await streamNdjson("http://localhost:5000/abstractive", formData, (event) => {
+        if (event.event !== "chunk") return;
+        setPartial((prev) =>
+          [...prev, { index: event.index, summary: event.summary }].sort((a, b) => a.index - b.index)
+        );
       });
 
-      setResponse(res.data.summary || "No summary returned.");
+      setResponse(final.summary || "No summary returned.");
     } catch (error) {
       console.error(error);
       setResponse("Failed to process file.");
     } finally {
+      setPartial([]);
       setLoading(false);
     }
   };
@@ -40,6 +48,7 @@ const AbsSummarizationDashboard = () => {
   const handleReset = () => {
     setFile(null);
     setResponse("");
+    setPartial([]);
   };
 
   const handleDownloadPDF = () => {
@@ -111,6 +120,19 @@ const AbsSummarizationDashboard = () => {
             </div>
           </div>
 
+          {loading && partial.length > 0 && (
+            <div className="bg-gray-50 border border-gray-200 rounded-xl p-5 max-h-96 overflow-y-auto shadow-inner text-left">
+              <h2 className="font-semibold text-gray-700 mb-3 text-lg">
+                ⏳ Section summaries ({partial.length} ready, combining when all are done):
+              </h2>
+              {partial.map((part) => (
+                <p key={part.index} className="text-gray-800 text-sm leading-relaxed whitespace-pre-wrap mb-3">
+                  {part.summary}
+                </p>
+              ))}
+            </div>
+          )}
+
           {response && (
             <>
               <motion.div
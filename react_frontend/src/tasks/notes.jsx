@@ -1,5 +1,5 @@
 import React, { useState } from "react";
-import axios from "axios";
+import { streamNdjson } from "../utils/streamNdjson";
 import { UploadCloud, Loader2, FileText, Download, RotateCcw } from "lucide-react";
 import { jsPDF } from "jspdf";
 import { motion } from "framer-motion";
@@ -37,10 +37,19 @@ const Notes = () => {
     const formData = new FormData();
     formData.append("file", file);
 
+    // Show each chunk's notes as soon as it is ready, in document order
+    const chunks = {};
     try {
-      const res = await axios.post("http://localhost:5000/notes", formData);
-      if (res.data.notes) {
-        setNotes(res.data.notes);
+      const final = await streamNdjson("http://localhost:5000/notes", formData, (event) => {
+        if (event.event !== "chunk") return;
+        chunks[event.index] = event.notes;
+        const ordered = Object.keys(chunks)
+          .sort((a, b) => a - b)
+          .map((i) => chunks[i]);
+        setNotes(ordered.join("\n\n"));
+      });
+      if (final.notes) {
+        setNotes(final.notes);
       } else {
         setError("Failed to generate notes.");
       }
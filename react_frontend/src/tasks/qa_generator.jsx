@@ -1,5 +1,5 @@
 import React, { useState } from "react";
-import axios from "axios";
+import { streamNdjson } from "../utils/streamNdjson";
 import { jsPDF } from "jspdf";
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
@@ -23,9 +23,20 @@ const QAGenerator = () => {
     formData.append("num_questions", numQuestions);
 
     setLoading(true);
+    setQaPairs([]);
+    // Pairs for each part of the document appear as soon as they are generated
+    const chunks = {};
     try {
-      const res = await axios.post("http://localhost:5000/generate-qa", formData);
-      setQaPairs(res.data.qa_pairs || []);
+      const final = await streamNdjson("http://localhost:5000/generate-qa", formData, (event) => {
+        if (event.event !== "chunk") return;
+        chunks[event.index] = event.qa_pairs;
+        setQaPairs(
+          Object.keys(chunks)
+            .sort((a, b) => a - b)
+            .flatMap((i) => chunks[i])
+        );
+      });
+      setQaPairs(final.qa_pairs || []);
     } catch (error) {
       alert("Error generating Q&A.");
       console.error(error);
@@ -0,0 +1,39 @@
+// POST a form to a streaming endpoint (?stream=1) and call onEvent for every
+// NDJSON line as soon as it arrives. Resolves with the final "done" event.
+export const streamNdjson = async (url, formData, onEvent) => {
+  const res = await fetch(`${url}?stream=1`, {
+    method: "POST",
+    body: formData,
+    headers: { Accept: "application/x-ndjson" },
+  });
+  if (!res.ok) {
+    const body = await res.json().catch(() => ({}));
+    throw new Error(body.error || `Request failed (${res.status})`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let final = null;
+
+  const handleLine = (line) => {
+    if (!line.trim()) return;
+    const event = JSON.parse(line);
+    if (event.event === "error") throw new Error(event.error);
+    if (event.event === "done") final = event;
+    onEvent(event);
+  };
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.forEach(handleLine);
+  }
+  handleLine(buffer);
+
+  if (!final) throw new Error("Stream ended before the result was complete.");
+  return final;
+};